@@ -1 +1,13 @@
-from materialsdb import ifc, cache, config, classes, serialiser
\ No newline at end of file
+import importlib
+
+from materialsdb import ifc, cache, config, classes, schemas, serialiser, snapshot
+
+# Imported on first access only: they need sqlite3 or numpy or are only used by
+# command line tools
+LAZY_MODULES = ("bulk", "catalogue", "columnar", "diff", "offsets", "search")
+
+
+def __getattr__(name):
+    if name in LAZY_MODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
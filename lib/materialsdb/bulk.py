@@ -0,0 +1,93 @@
+# coding: UTF-8
+"""This module deserialises many producers at once using a process pool.
+
+Processes are spawned from sys.executable so it is meant to be used from a command
+line python (e.g. a build server) and not from inside Revit.
+"""
+import functools
+import os
+import pathlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional
+
+from materialsdb import cache, classes, snapshot
+from materialsdb.serialiser import XmlDeserialiser
+
+LoadResult = namedtuple("LoadResult", ["path", "result", "error"])
+
+
+@functools.lru_cache(maxsize=None)
+def get_deserialiser() -> XmlDeserialiser:
+    """One deserialiser per process"""
+    return XmlDeserialiser()
+
+
+def identity(materials: classes.Materials) -> classes.Materials:
+    return materials
+
+
+def load_and_apply(
+    xml_path: pathlib.Path,
+    function: Callable[[classes.Materials], Any],
+    use_snapshots: bool,
+) -> Any:
+    if use_snapshots:
+        materials = snapshot.load(xml_path, get_deserialiser())
+    else:
+        materials = get_deserialiser().from_xml(str(xml_path))
+    return function(materials)
+
+
+def process_one(
+    xml_path: pathlib.Path,
+    function: Callable[[classes.Materials], Any] = identity,
+    use_snapshots: bool = True,
+) -> LoadResult:
+    result, error = cache.try_producer(
+        load_and_apply, xml_path, function, use_snapshots
+    )
+    return LoadResult(xml_path, result, error)
+
+
+def map_producers(
+    function: Callable[[classes.Materials], Any],
+    paths: Optional[Iterable[pathlib.Path]] = None,
+    workers: Optional[int] = None,
+    use_snapshots: bool = True,
+) -> List[LoadResult]:
+    """Deserialise each producer (default: every cached producer) and apply function
+    to it in a worker process. function must be picklable (module level function).
+    Results are sorted by path whatever order workers finish in."""
+    if paths is None:
+        paths = cache.producers()
+    paths = sorted(pathlib.Path(path) for path in paths)
+    workers = workers or os.cpu_count() or 1
+    task = functools.partial(
+        process_one, function=function, use_snapshots=use_snapshots
+    )
+    if workers == 1 or len(paths) <= 1:
+        return [task(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        return list(executor.map(task, paths))
+
+
+def load_producers(
+    paths: Optional[Iterable[pathlib.Path]] = None,
+    workers: Optional[int] = None,
+    use_snapshots: bool = True,
+) -> List[LoadResult]:
+    """Return deserialised materials of each producer in LoadResult.result"""
+    return map_producers(identity, paths, workers, use_snapshots)
+
+
+def main():
+    for result in load_producers():
+        if result.error:
+            print(f"{result.path.name}: {result.error}")
+        else:
+            print(f"{result.path.name}: {len(result.result.material)} materials")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,16 @@
+import hashlib
+import json
 import os
 import pathlib
+import threading
+import time
+import urllib.error
+import urllib.parse
 import urllib.request
 from collections import namedtuple
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Tuple
 from lxml import etree
 
 MATERIALSDBINDEXURLLIST = [
@@ -10,6 +18,15 @@ MATERIALSDBINDEXURLLIST = [
     "http://www.materialsdb.org/download/generic/GenericIndex.xml",
 ]
 
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_WORKERS_PER_HOST = 4
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_BACKOFF = 0.5
+CHUNK_SIZE = 2 ** 16
+# Errors of a producer file which is missing, unreadable, not valid xml or lacks
+# required materials data
+PRODUCER_ERRORS = (etree.XMLSyntaxError, OSError, ValueError)
+
 
 def get_cache_folder():
     cache_dir = pathlib.Path(
@@ -51,53 +68,415 @@ def require_update(cached_company, company) -> bool:
     return False
 
 
+IndexDiff = namedtuple("IndexDiff", ["added", "changed", "removed", "unchanged"])
+
+
+def diff_index(cached_root: etree._Element, new_root: etree._Element) -> IndexDiff:
+    """Compare companies of two indexes by id in linear time.
+    added and unchanged are companies of new_root, removed are companies of
+    cached_root and changed are (cached_company, company) pairs requiring an update"""
+    cached_by_id = {company.get("id"): company for company in cached_root}
+    added = []
+    changed = []
+    unchanged = []
+    for company in new_root:
+        cached_company = cached_by_id.pop(company.get("id"), None)
+        if cached_company is None:
+            added.append(company)
+        elif require_update(cached_company, company):
+            changed.append((cached_company, company))
+        else:
+            unchanged.append(company)
+    return IndexDiff(added, changed, list(cached_by_id.values()), unchanged)
+
+
 def get_producers_dir() -> pathlib.Path:
     producer_path = get_cache_folder().joinpath("Producers")
     pathlib.Path(producer_path).mkdir(parents=True, exist_ok=True)
     return producer_path
 
 
-Report = namedtuple("Report", ["existing", "updated", "deleted"])
+# failed are producers which could not be downloaded. They are downloaded again on
+# next update.
+Report = namedtuple(
+    "Report", ["existing", "updated", "deleted", "failed"], defaults=((),)
+)
+
+
+class HostLimiter:
+    """Limit the number of simultaneous connections to a same host"""
+
+    def __init__(self, per_host: int = DOWNLOAD_WORKERS_PER_HOST):
+        self.per_host = per_host
+        self.semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def __call__(self, url: str):
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            semaphore = self.semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host)
+                self.semaphores[host] = semaphore
+        with semaphore:
+            yield
+
+
+def is_retryable(err: Exception) -> bool:
+    if isinstance(err, urllib.error.HTTPError):
+        return err.code >= 500 or err.code == 429
+    return isinstance(err, OSError)
+
+
+def get_manifest_path() -> pathlib.Path:
+    return get_cache_folder() / "manifest.json"
+
+
+class Manifest:
+    """ETag, Last-Modified and SHA-256 of every cached index and producer by url"""
+
+    def __init__(self, path: Optional[pathlib.Path] = None):
+        self.path = path or get_manifest_path()
+        self.entries: Dict[str, Dict[str, str]] = {}
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text("utf-8"))
+        self.lock = threading.Lock()
+
+    def get(self, url: str) -> Dict[str, str]:
+        with self.lock:
+            return dict(self.entries.get(url, {}))
+
+    def set(self, url: str, entry: Dict[str, str]) -> None:
+        with self.lock:
+            self.entries[url] = entry
+
+    def save(self) -> None:
+        with self.lock, replacing(self.path) as temp_path:
+            temp_path.write_text(json.dumps(self.entries, indent=1), encoding="utf-8")
+
+
+def conditional_request(
+    url: str, entry: Dict[str, str], headers: Dict[str, str]
+) -> urllib.request.Request:
+    headers = dict(headers)
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return urllib.request.Request(url, headers=headers)
+
+
+class MemoryTarget:
+    """Keep downloaded content in memory"""
+
+    def __init__(self):
+        self.content = b""
+
+    def headers(self) -> Dict[str, str]:
+        return {}
+
+    def write(self, response: BinaryIO) -> str:
+        self.content = response.read()
+        return hashlib.sha256(self.content).hexdigest()
+
+    def discard(self) -> None:
+        self.content = b""
+
+
+class PartialFile:
+    """Download to a .part file next to path. An interrupted download is resumed
+    with an HTTP Range request as long as server still serves the same version"""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path.with_name(path.name + ".part")
+        self.validator_path = path.with_name(path.name + ".part.json")
+
+    def headers(self) -> Dict[str, str]:
+        if not (self.path.exists() and self.validator_path.exists()):
+            return {}
+        validator = json.loads(self.validator_path.read_text("utf-8"))
+        if not validator:
+            return {}
+        return {"Range": f"bytes={self.path.stat().st_size}-", "If-Range": validator}
+
+    def write(self, response: BinaryIO) -> str:
+        sha256 = hashlib.sha256()
+        if response.status == 206:
+            mode = "ab"
+            sha256 = file_sha256(self.path)
+        else:
+            mode = "wb"
+            # If-Range only accepts a strong ETag or a Last-Modified date
+            etag = response.headers.get("ETag", "")
+            validator = response.headers.get("Last-Modified", "")
+            if etag and not etag.startswith("W/"):
+                validator = etag
+            self.validator_path.write_text(json.dumps(validator), encoding="utf-8")
+        with self.path.open(mode) as file:
+            for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                sha256.update(chunk)
+                file.write(chunk)
+        return sha256.hexdigest()
+
+    def discard(self) -> None:
+        self.path.unlink(True)
+        self.validator_path.unlink(True)
+
+    def commit(self, path: pathlib.Path) -> None:
+        os.replace(self.path, path)
+        self.validator_path.unlink(True)
+
+
+def fetch(
+    url: str,
+    target,
+    entry: Dict[str, str],
+    retries: int = DOWNLOAD_RETRIES,
+    backoff: float = DOWNLOAD_BACKOFF,
+    limiter: Optional[HostLimiter] = None,
+) -> Optional[Dict[str, str]]:
+    """Request url revalidating entry. Response body is passed to target.write which
+    returns its SHA-256. Return the new manifest entry or None if server answered 304.
+    Network errors and server errors are retried with an exponential backoff:
+    backoff, 2 * backoff, 4 * backoff…"""
+    limiter = limiter or HostLimiter()
+    attempt = 0
+    while True:
+        request = conditional_request(url, entry, target.headers())
+        try:
+            with limiter(url), urllib.request.urlopen(request) as response:
+                sha256 = target.write(response)
+                return {
+                    "etag": response.headers.get("ETag", ""),
+                    "last_modified": response.headers.get("Last-Modified", ""),
+                    "sha256": sha256,
+                }
+        except urllib.error.HTTPError as err:
+            if err.code == 304:
+                return None
+            if err.code == 416 and request.has_header("Range"):
+                # Partial content does not match what server has anymore. It is
+                # discarded and whole file is requested again without Range.
+                target.discard()
+                continue
+            if attempt == retries or not is_retryable(err):
+                raise
+        except OSError as err:
+            if attempt == retries or not is_retryable(err):
+                raise
+        time.sleep(backoff * 2 ** attempt)
+        attempt += 1
+
+
+def file_sha256(path: pathlib.Path):
+    sha256 = hashlib.sha256()
+    with path.open("rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256
+
+
+def try_producer(
+    function: Callable[..., Any], path: pathlib.Path, *args
+) -> Tuple[Any, Optional[str]]:
+    """Return (function(path, *args), None) or (None, error message) if path is a bad
+    producer so one bad producer does not stop processing of others"""
+    try:
+        return function(path, *args), None
+    except PRODUCER_ERRORS as err:
+        return None, f"{type(err).__name__}: {err}"
+
+
+def is_well_formed(path: pathlib.Path) -> bool:
+    try:
+        for _, element in etree.iterparse(str(path), events=("end",)):
+            element.clear()
+    except etree.XMLSyntaxError:
+        return False
+    return True
+
+
+def stat_entry(path: pathlib.Path) -> Dict[str, float]:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def is_unchanged(entry: Dict[str, Any], path: pathlib.Path) -> bool:
+    """True if path still has the content entry was recorded for. entry holds
+    stat_entry of path and optionally its sha256. Hash is only computed if size is
+    the same but modification time changed: entry then gets the new modification
+    time so next check does not need to hash again."""
+    stat = stat_entry(path)
+    if entry.get("size") != stat["size"]:
+        return False
+    if entry.get("mtime") == stat["mtime"]:
+        return True
+    if not entry.get("sha256") or file_sha256(path).hexdigest() != entry["sha256"]:
+        return False
+    entry.update(stat)
+    return True
+
+
+@contextmanager
+def replacing(path: pathlib.Path) -> Iterator[pathlib.Path]:
+    """Yield a temporary path next to path which replaces path once the block
+    succeeds so a reader never sees a partially written file"""
+    temp_path = path.with_name(path.name + ".tmp")
+    try:
+        yield temp_path
+    except BaseException:
+        temp_path.unlink(True)
+        raise
+    os.replace(temp_path, path)
+
+
+def verify(url: str, path: pathlib.Path, manifest: Manifest) -> bool:
+    """Check that cached path is complete. Files cached before manifest existed are
+    checked for well-formedness"""
+    if not path.exists():
+        return False
+    entry = manifest.get(url)
+    if entry.get("sha256"):
+        mtime = entry.get("mtime")
+        if not is_unchanged(entry, path):
+            return False
+        if entry["mtime"] != mtime:
+            manifest.set(url, entry)
+        return True
+    if not is_well_formed(path):
+        return False
+    entry["sha256"] = file_sha256(path).hexdigest()
+    entry.update(stat_entry(path))
+    manifest.set(url, entry)
+    return True
+
+
+def download(
+    url: str,
+    path: pathlib.Path,
+    manifest: Manifest,
+    retries: int = DOWNLOAD_RETRIES,
+    backoff: float = DOWNLOAD_BACKOFF,
+    limiter: Optional[HostLimiter] = None,
+) -> bool:
+    """Download url to path unless cached path is still fresh. Return True if path
+    has been written. path is only replaced once download is complete and well-formed"""
+    entry = manifest.get(url) if verify(url, path, manifest) else {}
+    partial = PartialFile(path)
+    new_entry = fetch(url, partial, entry, retries, backoff, limiter)
+    if new_entry is None:
+        return False
+    if not is_well_formed(partial.path):
+        partial.discard()
+        raise ValueError(f"{url}: downloaded file is not well-formed xml")
+    partial.commit(path)
+    new_entry.update(stat_entry(path))
+    manifest.set(url, new_entry)
+    return True
+
+
+def fetch_index(
+    index: str,
+    manifest: Manifest,
+    retries: int = DOWNLOAD_RETRIES,
+    backoff: float = DOWNLOAD_BACKOFF,
+) -> Optional[Tuple[bytes, Dict[str, str]]]:
+    """Return index content and its manifest entry or None if cached index is still
+    fresh. Entry is not recorded here: it must only be once index has been written
+    otherwise next update would be answered 304 and keep the old cached index"""
+    target = MemoryTarget()
+    entry = manifest.get(index) if get_cached_index_path(index).exists() else {}
+    new_entry = fetch(index, target, entry, retries, backoff)
+    if new_entry is None:
+        return None
+    return target.content, new_entry
 
 
-def update_producers_data(url_list=MATERIALSDBINDEXURLLIST):
+def update_producers_data(url_list=MATERIALSDBINDEXURLLIST, **kwargs):
     existing = []
     updated = []
     deleted = []
+    failed = []
     for index in url_list:
-        report = update_producers_from_index(index)
+        report = update_producers_from_index(index, **kwargs)
         existing.extend(report.existing)
         updated.extend(report.updated)
         deleted.extend(report.deleted)
-    return Report(existing, updated, deleted)
+        failed.extend(report.failed)
+    return Report(existing, updated, deleted, failed)
 
 
-def update_producers_from_index(index):
-    cached_index = parse_cached_index(index)
-    cached_root = cached_index.getroot()
-    new_index = etree.parse(index)
-    new_root = new_index.getroot()
+def update_producers_from_index(
+    index,
+    workers: int = DOWNLOAD_WORKERS,
+    per_host: int = DOWNLOAD_WORKERS_PER_HOST,
+    retries: int = DOWNLOAD_RETRIES,
+    backoff: float = DOWNLOAD_BACKOFF,
+):
+    """Download producers which are new or updated in index using up to workers
+    simultaneous downloads. workers=1 downloads producers one at a time.
+    Index and producers are revalidated with conditional requests: if index has not
+    been modified since last update only missing producers are downloaded.
+    A producer which cannot be downloaded is reported in failed and does not stop
+    others. New index is then not cached so failed producers are retried next time."""
+    manifest = Manifest()
+    cached_root = parse_cached_index(index).getroot()
+    fetched = fetch_index(index, manifest, retries, backoff)
+    new_root = cached_root if fetched is None else etree.fromstring(fetched[0])
     producers_dir = get_producers_dir()
-    has_index_update = False
     existing = []
     updated = []
     deleted = []
+    failed = []
+    diff = diff_index(cached_root, new_root)
+    unchanged_ids = {company.get("id") for company in diff.unchanged}
+    cached_paths = {
+        company.get("id"): producers_dir / pathlib.Path(cached_company.get("href")).name
+        for cached_company, company in diff.changed
+    }
+    # (url, path, cached_path, download required) of every producer in index order
+    tasks = []
     for company in new_root:
-        cached_producer = get_by_id(cached_root, company.get("id"))
-        producer_path = producers_dir / pathlib.Path(company.get("href")).name
-        if not require_update(cached_producer, company) and producer_path.exists():
-            existing.append(producer_path)
-            continue
-        if cached_producer:
-            cached_path = producers_dir / pathlib.Path(cached_producer.get("href")).name
-            deleted.append(cached_path)
-            cached_path.unlink(True)
-        has_index_update = True
-        urllib.request.urlretrieve(company.get("href"), producer_path)
-        updated.append(producer_path)
-    if has_index_update:
-        new_index.write(str(get_cached_index_path(index)))
-    return Report(existing, updated, deleted)
+        url = company.get("href")
+        path = producers_dir / pathlib.Path(url).name
+        fresh = company.get("id") in unchanged_ids and verify(url, path, manifest)
+        tasks.append((url, path, cached_paths.get(company.get("id")), not fresh))
+    limiter = HostLimiter(per_host)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [
+            executor.submit(download, url, path, manifest, retries, backoff, limiter)
+            if required
+            else None
+            for url, path, cached_path, required in tasks
+        ]
+    try:
+        # Results are collected in index order so the report is deterministic
+        for (url, path, cached_path, required), future in zip(tasks, futures):
+            if future is None:
+                existing.append(path)
+                continue
+            try:
+                written = future.result()
+            except PRODUCER_ERRORS as err:
+                print(f"{path.name}: download failed: {type(err).__name__}: {err}")
+                failed.append(path)
+                continue
+            if not written:
+                existing.append(path)
+                continue
+            if cached_path is not None:
+                deleted.append(cached_path)
+                if cached_path != path:
+                    cached_path.unlink(True)
+            updated.append(path)
+        if fetched is not None and not failed:
+            content, index_entry = fetched
+            get_cached_index_path(index).write_bytes(content)
+            manifest.set(index, index_entry)
+    finally:
+        manifest.save()
+    return Report(existing, updated, deleted, failed)
 
 
 def producers():
@@ -0,0 +1,407 @@
+# coding: UTF-8
+"""This module keeps a SQLite catalogue of materials of every cached producer.
+
+Catalogue stores materials, their names and countries, their layers and per-country
+geometry, thermal and physical values so they can be queried across producers without
+deserialising xml. It is updated incrementally: only producers which are new, updated
+or deleted are imported again.
+"""
+import pathlib
+import sqlite3
+import typing
+from collections import namedtuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from materialsdb import cache, classes, snapshot
+from materialsdb.serialiser import strip_optional
+
+CATALOGUE_VERSION = 1
+# table name: per-country values class stored for each layer
+VALUE_TABLES: Dict[str, Type] = {
+    "geometry": classes.Geometry,
+    "thermal": classes.Thermal,
+    "physical": classes.Physical,
+}
+
+# names: {(lang, country): name} with "" for a name without language or country
+Result = namedtuple("Result", ["id", "producer", "group", "names"])
+
+
+def get_catalogue_path() -> pathlib.Path:
+    return cache.get_cache_folder() / "catalogue.sqlite"
+
+
+def column_type(value_class: Type) -> str:
+    if isinstance(value_class, type) and issubclass(value_class, int):
+        return "INTEGER"
+    if isinstance(value_class, type) and issubclass(value_class, float):
+        return "REAL"
+    return "TEXT"
+
+
+def get_columns(value_class: Type) -> Dict[str, str]:
+    """Column name: SQL type of every xml attribute of value_class"""
+    type_hints = typing.get_type_hints(value_class)
+    return {
+        attrib: column_type(strip_optional(type_hints[attrib]))
+        for attrib in value_class.xml_attributes
+    }
+
+
+def value_columns() -> Dict[str, str]:
+    """Column name: table name of columns which can be filtered by range"""
+    columns = {}
+    for table, value_class in VALUE_TABLES.items():
+        for column, sql_type in get_columns(value_class).items():
+            if column != "country" and sql_type != "TEXT":
+                columns[column] = table
+    return columns
+
+
+def get_schema() -> str:
+    statements = [
+        f"PRAGMA user_version = {CATALOGUE_VERSION}",
+        """CREATE TABLE IF NOT EXISTS producers (
+            id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, size INTEGER,
+            mtime REAL, company TEXT, companyid TEXT, ver INTEGER)""",
+        """CREATE TABLE IF NOT EXISTS materials (
+            id INTEGER PRIMARY KEY,
+            producer INTEGER NOT NULL REFERENCES producers(id) ON DELETE CASCADE,
+            position INTEGER, material_id TEXT, type TEXT, group_kind TEXT)""",
+        """CREATE TABLE IF NOT EXISTS names (
+            material INTEGER NOT NULL REFERENCES materials(id) ON DELETE CASCADE,
+            lang TEXT, country TEXT, name TEXT)""",
+        """CREATE TABLE IF NOT EXISTS countries (
+            material INTEGER NOT NULL REFERENCES materials(id) ON DELETE CASCADE,
+            country TEXT, selling_from REAL, selling_until REAL)""",
+        """CREATE TABLE IF NOT EXISTS layers (
+            id INTEGER PRIMARY KEY,
+            material INTEGER NOT NULL REFERENCES materials(id) ON DELETE CASCADE,
+            position INTEGER, layer_id TEXT)""",
+        "CREATE INDEX IF NOT EXISTS materials_producer ON materials(producer)",
+        "CREATE INDEX IF NOT EXISTS materials_id ON materials(material_id)",
+        "CREATE INDEX IF NOT EXISTS materials_group ON materials(group_kind)",
+        "CREATE INDEX IF NOT EXISTS names_material ON names(material)",
+        "CREATE INDEX IF NOT EXISTS countries_material ON countries(material, country)",
+        "CREATE INDEX IF NOT EXISTS layers_material ON layers(material)",
+    ]
+    for table, value_class in VALUE_TABLES.items():
+        columns = ", ".join(
+            f'"{column}" {sql_type}'
+            for column, sql_type in get_columns(value_class).items()
+        )
+        statements.append(
+            f"""CREATE TABLE IF NOT EXISTS {table} (
+            layer INTEGER NOT NULL REFERENCES layers(id) ON DELETE CASCADE, {columns})"""
+        )
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS {table}_layer ON {table}(layer, country)"
+        )
+    for column, table in value_columns().items():
+        statements.append(
+            f'CREATE INDEX IF NOT EXISTS {table}_{column} ON {table}("{column}")'
+        )
+    return ";\n".join(statements)
+
+
+class Catalogue:
+    """SQLite catalogue of cached producers"""
+
+    def __init__(self, path: Optional[pathlib.Path] = None):
+        self.path = path or get_catalogue_path()
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, CATALOGUE_VERSION):
+            self.drop()
+        self.connection.executescript(get_schema())
+        self.columns = {
+            table: list(get_columns(value_class))
+            for table, value_class in VALUE_TABLES.items()
+        }
+        self.ranges = value_columns()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def drop(self) -> None:
+        tables = self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        ).fetchall()
+        with self.connection:
+            for (table,) in tables:
+                self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+
+    def producers(self) -> Dict[str, Tuple[int, int, float]]:
+        """path: (id, size, mtime) of imported producers"""
+        return {
+            path: (id, size, mtime)
+            for id, path, size, mtime in self.connection.execute(
+                "SELECT id, path, size, mtime FROM producers"
+            )
+        }
+
+    def remove(self, path) -> None:
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM producers WHERE path = ?", (str(pathlib.Path(path)),)
+            )
+
+    def add(self, path, materials: classes.Materials) -> None:
+        """Replace catalogue content of producer path by materials"""
+        path = pathlib.Path(path)
+        stat = cache.stat_entry(path)
+        connection = self.connection
+        with connection:
+            connection.execute("DELETE FROM producers WHERE path = ?", (str(path),))
+            producer = connection.execute(
+                """INSERT INTO producers (path, size, mtime, company, companyid, ver)
+                VALUES (?, ?, ?, ?, ?, ?)""",
+                (
+                    str(path),
+                    stat["size"],
+                    stat["mtime"],
+                    materials.company,
+                    materials.companyid,
+                    materials.ver,
+                ),
+            ).lastrowid
+            names = []
+            countries = []
+            values: Dict[str, List[Tuple[Any, ...]]] = {
+                table: [] for table in VALUE_TABLES
+            }
+            for position, material in enumerate(materials.material):
+                information = material.information
+                material_row = connection.execute(
+                    """INSERT INTO materials
+                    (producer, position, material_id, type, group_kind)
+                    VALUES (?, ?, ?, ?, ?)""",
+                    (producer, position, material.id, material.type, information.group),
+                ).lastrowid
+                for name in getattr(information.names, "name", ()):
+                    names.append(
+                        (
+                            material_row,
+                            getattr(name, "lang", None),
+                            getattr(name, "country", None),
+                            str(name),
+                        )
+                    )
+                for country in getattr(information.countries, "country", ()):
+                    countries.append(
+                        (
+                            material_row,
+                            country.name,
+                            country.sellingfrom,
+                            country.sellinguntil,
+                        )
+                    )
+                layers = getattr(material.layers, "layer", ())
+                for layer_position, layer in enumerate(layers):
+                    layer_row = connection.execute(
+                        "INSERT INTO layers (material, position, layer_id) VALUES (?, ?, ?)",
+                        (material_row, layer_position, layer.id),
+                    ).lastrowid
+                    for table, columns in self.columns.items():
+                        for value in getattr(layer, table) or ():
+                            values[table].append(
+                                (layer_row,)
+                                + tuple(getattr(value, column) for column in columns)
+                            )
+            connection.executemany("INSERT INTO names VALUES (?, ?, ?, ?)", names)
+            connection.executemany(
+                "INSERT INTO countries VALUES (?, ?, ?, ?)", countries
+            )
+            for table, rows in values.items():
+                placeholders = ", ".join("?" * (len(self.columns[table]) + 1))
+                connection.executemany(
+                    f"INSERT INTO {table} VALUES ({placeholders})", rows
+                )
+
+    def import_producer(self, path) -> bool:
+        """Import producer from its snapshot or xml. Return False if it failed"""
+        materials, error = cache.try_producer(snapshot.load, path)
+        if error:
+            print(f"{pathlib.Path(path).name}: catalogue import failed: {error}")
+            return False
+        self.add(path, materials)
+        return True
+
+    def update(self, report: cache.Report) -> List[pathlib.Path]:
+        """Apply a cache update report: remove deleted producers, import updated ones
+        and existing ones which are not in catalogue yet or modified since import.
+        Return imported producers."""
+        for path in report.deleted:
+            if path not in report.updated:
+                self.remove(path)
+        imported = []
+        for path in report.updated:
+            if self.import_producer(path):
+                imported.append(path)
+        imported.extend(self.sync(report.existing, remove_missing=False))
+        return imported
+
+    def sync(
+        self, paths: Optional[Iterable[pathlib.Path]] = None, remove_missing=True
+    ) -> List[pathlib.Path]:
+        """Import producers (default: every cached producer) which are new or modified
+        according to their size and modification time. Return imported producers."""
+        if paths is None:
+            paths = cache.producers()
+        known = self.producers()
+        paths = [pathlib.Path(path) for path in paths]
+        imported = []
+        for path in paths:
+            record = known.get(str(path))
+            if record and cache.is_unchanged(
+                {"size": record[1], "mtime": record[2]}, path
+            ):
+                continue
+            if self.import_producer(path):
+                imported.append(path)
+        if remove_missing:
+            for path in set(known) - {str(path) for path in paths}:
+                self.remove(path)
+        return imported
+
+    def query(
+        self,
+        group: Optional[str] = None,
+        country: Optional[str] = None,
+        name: Optional[str] = None,
+        lang: Optional[str] = None,
+        limit: Optional[int] = None,
+        **ranges: Tuple[Optional[float], Optional[float]],
+    ) -> List[Result]:
+        """Materials matching every given criteria:
+        group: information group (e.g. "Insulation")
+        country: sold in country (or not restricted to any) and with values for this
+        country, or values for any country if a layer has none for this country
+        name: case insensitive part of a name, in lang if given
+        ranges: value column with a (minimum, maximum) tuple, None for unbounded
+        e.g. lambda_value=(0.02, 0.04), density=(None, 200), thick=(0.1, None)"""
+        clauses = []
+        parameters: List[Any] = []
+        if group is not None:
+            clauses.append("m.group_kind = ?")
+            parameters.append(group)
+        if country is not None:
+            clauses.append(
+                """(NOT EXISTS (SELECT 1 FROM countries c WHERE c.material = m.id)
+                OR EXISTS (SELECT 1 FROM countries c
+                WHERE c.material = m.id AND c.country = ?))"""
+            )
+            parameters.append(country)
+        if name is not None:
+            clause = "EXISTS (SELECT 1 FROM names n WHERE n.material = m.id AND n.name LIKE ?"
+            parameters.append(f"%{name}%")
+            if lang is not None:
+                clause += " AND n.lang = ?"
+                parameters.append(lang)
+            clauses.append(clause + ")")
+        if ranges:
+            clauses.append(self.ranges_clause(ranges, country, parameters))
+        sql = """SELECT m.id, m.material_id, p.path, m.group_kind, m.position
+            FROM materials m JOIN producers p ON p.id = m.producer"""
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY p.path, m.position"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        # Names of every selected material are fetched by the same query
+        sql = f"""SELECT m.id, m.material_id, m.path, m.group_kind, n.lang, n.country,
+            n.name FROM ({sql}) m LEFT JOIN names n ON n.material = m.id
+            ORDER BY m.path, m.position, n.rowid"""
+        results: Dict[int, Result] = {}
+        rows = self.connection.execute(sql, parameters)
+        for row, material_id, path, group, lang, name_country, name in rows:
+            result = results.get(row)
+            if result is None:
+                result = results[row] = Result(
+                    material_id, pathlib.Path(path), group, {}
+                )
+            if name is not None:
+                result.names[(lang or "", name_country or "")] = name
+        return list(results.values())
+
+    def ranges_clause(
+        self,
+        ranges: Dict[str, Tuple[Optional[float], Optional[float]]],
+        country: Optional[str],
+        parameters: List[Any],
+    ) -> str:
+        """Clause matching materials with a layer satisfying every range at once.
+        With country, values without country are only used by a layer which has none
+        for country, as utils.get_by_country does. Without country, values of
+        different tables must be defined for the same country (or for any country)."""
+        conditions = []
+        values: List[Any] = []
+        tables: List[str] = []
+        for column, (minimum, maximum) in ranges.items():
+            table = self.ranges.get(column)
+            if table is None:
+                raise ValueError(
+                    f"'{column}' is not a numeric column of {', '.join(VALUE_TABLES)}"
+                )
+            if table not in tables:
+                tables.append(table)
+            if minimum is not None:
+                conditions.append(f'{table}."{column}" >= ?')
+                values.append(minimum)
+            if maximum is not None:
+                conditions.append(f'{table}."{column}" <= ?')
+                values.append(maximum)
+            if minimum is None and maximum is None:
+                conditions.append(f'{table}."{column}" IS NOT NULL')
+        joins = []
+        first = tables[0]
+        for table in tables:
+            join = f"JOIN {table} ON {table}.layer = l.id"
+            if country is not None:
+                join += f""" AND ({table}.country = ? OR {table}.country IS NULL
+                    AND NOT EXISTS (SELECT 1 FROM {table} o
+                    WHERE o.layer = l.id AND o.country = ?))"""
+                parameters.extend((country, country))
+            elif table != first:
+                join += f""" AND ({table}.country IS NULL OR {first}.country IS NULL
+                    OR {table}.country = {first}.country)"""
+            joins.append(join)
+        parameters.extend(values)
+        return f"""EXISTS (SELECT 1 FROM layers l {" ".join(joins)}
+            WHERE l.material = m.id AND {" AND ".join(conditions)})"""
+
+    def names(self, material_row: int) -> Dict[Tuple[str, str], str]:
+        """(lang, country): name of a material ("" for names without language or
+        country)"""
+        return {
+            (lang or "", country or ""): name
+            for lang, country, name in self.connection.execute(
+                "SELECT lang, country, name FROM names WHERE material = ?",
+                (material_row,),
+            )
+        }
+
+
+def update(report: Optional[cache.Report] = None) -> List[pathlib.Path]:
+    """Update catalogue from a cache update report. Without report, cache is updated
+    first."""
+    report = report or cache.update_producers_data()
+    with Catalogue() as catalogue:
+        return catalogue.update(report)
+
+
+def main():
+    for path in update():
+        print(f"{path.name}: imported in catalogue")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# coding: UTF-8
+"""This module flattens layer properties of every cached producer into numpy columns.
+
+There is one row per (material, layer, country). Key columns (producer, material,
+layer, position, country, group) are fixed width string or int arrays and layer_index
+numbers layers across producers. Value columns
+are float64 arrays named after the attribute they come from (thick, lambda_value,
+density, GWP…), NaN where a layer does not have the value. A country row falls back to
+the unqualified value as utils.get_by_country does. The row of unqualified values has
+country "".
+
+Columns are saved as one .npy file each so they can be memory mapped and filtered or
+aggregated without deserialising xml again:
+
+    columns = Columns.load()
+    mask = columns.mask(group="insulation", country="CH", lambda_value=(None, 0.035))
+    columns.aggregate("producer", "GWP", mask=mask)
+
+numpy is required. It is not a dependency of the Revit tools so this module is not
+imported by the package.
+"""
+import json
+import pathlib
+import warnings
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+import numpy as np
+
+from materialsdb import bulk, cache, classes, utils
+from materialsdb.catalogue import get_columns
+
+COLUMNS_VERSION = 1
+# Layer element: values class whose numeric attributes are exported
+VALUE_TABLES: Dict[str, Type] = {
+    "geometry": classes.Geometry,
+    "thermal": classes.Thermal,
+    "physical": classes.Physical,
+    "lcia": classes.Lcia,
+}
+KEY_COLUMNS = (
+    "producer",
+    "material",
+    "layer",
+    "position",
+    "country",
+    "group",
+    "layer_index",
+)
+INT_COLUMNS = ("position", "layer_index")
+
+
+def get_columns_dir() -> pathlib.Path:
+    return cache.get_cache_folder() / "columns"
+
+
+def value_columns() -> Dict[str, str]:
+    """Column name: layer element of every exported numeric attribute"""
+    columns: Dict[str, str] = {}
+    for table, value_class in VALUE_TABLES.items():
+        for column, sql_type in get_columns(value_class).items():
+            if column == "country" or sql_type == "TEXT":
+                continue
+            if column in columns or column in KEY_COLUMNS:
+                raise ValueError(f"{table}.{column} column name is not unique")
+            columns[column] = table
+    return columns
+
+
+def flatten(materials: classes.Materials) -> Dict[str, List[Any]]:
+    """Rows of a producer as lists per column except producer. Module level so it
+    can run in a bulk.map_producers worker."""
+    columns = value_columns()
+    rows: Dict[str, List[Any]] = {
+        column: [] for column in KEY_COLUMNS[1:] + tuple(columns)
+    }
+    layer_count = -1
+    for material in materials.material:
+        group = material.information.group or ""
+        for position, layer in enumerate(getattr(material.layers, "layer", ())):
+            layer_count += 1
+            tables = {table: getattr(layer, table) or () for table in VALUE_TABLES}
+            countries = {
+                value.country or None for values in tables.values() for value in values
+            }
+            for country in sorted(countries, key=lambda country: country or ""):
+                values = {
+                    table: utils.get_by_country(table_values, country)
+                    for table, table_values in tables.items()
+                }
+                rows["material"].append(material.id)
+                rows["layer"].append(layer.id)
+                rows["position"].append(position)
+                rows["country"].append(country or "")
+                rows["group"].append(group)
+                rows["layer_index"].append(layer_count)
+                for column, table in columns.items():
+                    value = getattr(values[table], column, None)
+                    rows[column].append(np.nan if value is None else float(value))
+    return rows
+
+
+def to_arrays(
+    producers: Iterable[Tuple[str, Dict[str, List[Any]]]]
+) -> Dict[str, np.ndarray]:
+    """Concatenate flattened producers into one array per column"""
+    lists: Dict[str, List[Any]] = {
+        column: [] for column in KEY_COLUMNS + tuple(value_columns())
+    }
+    layers = 0
+    for producer, rows in producers:
+        for column, values in rows.items():
+            if column == "layer_index":
+                values = [layer_index + layers for layer_index in values]
+            lists[column].extend(values)
+        lists["producer"].extend([producer] * len(rows["material"]))
+        if rows["layer_index"]:
+            layers += rows["layer_index"][-1] + 1
+    arrays = {}
+    for column, values in lists.items():
+        if column in INT_COLUMNS:
+            arrays[column] = np.array(values, dtype=np.int64)
+        elif column in KEY_COLUMNS:
+            arrays[column] = (
+                np.array(values, dtype=str) if values else np.array([], "U1")
+            )
+        else:
+            arrays[column] = np.array(values, dtype=np.float64)
+    return arrays
+
+
+class Columns:
+    """Layer properties of many producers as numpy arrays of equal length"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.arrays[column]
+
+    def __len__(self) -> int:
+        return len(self.arrays["material"])
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.arrays)
+
+    @classmethod
+    def from_producers(
+        cls,
+        paths: Optional[Iterable[pathlib.Path]] = None,
+        workers: Optional[int] = None,
+    ) -> "Columns":
+        """Flatten producers (default: every cached producer) in a process pool"""
+        flattened = []
+        for result in bulk.map_producers(flatten, paths, workers):
+            if result.error:
+                print(f"{result.path.name}: columnar export failed: {result.error}")
+                continue
+            flattened.append((result.path.name, result.result))
+        return cls(to_arrays(flattened))
+
+    def save(self, directory: Optional[pathlib.Path] = None) -> pathlib.Path:
+        directory = pathlib.Path(directory or get_columns_dir())
+        directory.mkdir(parents=True, exist_ok=True)
+        for column, array in self.arrays.items():
+            np.save(directory / f"{column}.npy", array, allow_pickle=False)
+        content = {
+            "version": COLUMNS_VERSION,
+            "rows": len(self),
+            "columns": {
+                column: array.dtype.str for column, array in self.arrays.items()
+            },
+        }
+        (directory / "columns.json").write_text(json.dumps(content), encoding="utf-8")
+        return directory
+
+    @classmethod
+    def load(
+        cls, directory: Optional[pathlib.Path] = None, mmap: bool = True
+    ) -> "Columns":
+        """Load saved columns, memory mapped by default so only accessed pages are
+        read"""
+        directory = pathlib.Path(directory or get_columns_dir())
+        content = json.loads((directory / "columns.json").read_text("utf-8"))
+        if content.get("version") != COLUMNS_VERSION:
+            raise ValueError(f"{directory}: columns version is not supported")
+        mmap_mode = "r" if mmap else None
+        return cls(
+            {
+                column: np.load(directory / f"{column}.npy", mmap_mode=mmap_mode)
+                for column in content["columns"]
+            }
+        )
+
+    def mask(
+        self,
+        group: Optional[str] = None,
+        country: Optional[str] = None,
+        producer: Optional[str] = None,
+        **ranges: Tuple[Optional[float], Optional[float]],
+    ) -> np.ndarray:
+        """Boolean array of rows matching every key and (minimum, maximum) value range
+        e.g. mask(group="insulation", lambda_value=(None, 0.04)). Rows without the
+        value never match a range. country selects rows of this country and
+        unqualified rows of layers which have none for this country."""
+        mask = np.ones(len(self), dtype=bool)
+        for column, value in (("group", group), ("producer", producer)):
+            if value is not None:
+                mask &= self.arrays[column] == value
+        if country is not None:
+            mask &= self.country_rows(country)
+        for column, (minimum, maximum) in ranges.items():
+            values = self.arrays[column]
+            if minimum is not None:
+                mask &= values >= minimum
+            if maximum is not None:
+                mask &= values <= maximum
+            if minimum is None and maximum is None:
+                mask &= ~np.isnan(values)
+        return mask
+
+    def country_rows(self, country: str) -> np.ndarray:
+        countries = self.arrays["country"]
+        layer_index = self.arrays["layer_index"]
+        rows = countries == country
+        if country:
+            unqualified = countries == ""
+            unqualified &= ~np.isin(layer_index, layer_index[rows])
+            rows |= unqualified
+        return rows
+
+    def aggregate(
+        self,
+        by: str,
+        column: str,
+        function: Callable[[np.ndarray], Any] = np.nanmean,
+        mask: Optional[np.ndarray] = None,
+    ) -> Dict[Any, Any]:
+        """Apply function to values of column grouped by key column by
+        e.g. aggregate("group", "density") -> {"insulation": 45.2, …}"""
+        keys = self.arrays[by]
+        values = self.arrays[column]
+        if mask is not None:
+            keys = keys[mask]
+            values = values[mask]
+        unique, inverse, counts = np.unique(
+            keys, return_inverse=True, return_counts=True
+        )
+        parts = np.split(
+            values[np.argsort(inverse, kind="stable")], np.cumsum(counts)[:-1]
+        )
+        with warnings.catch_warnings():  # groups without any value give NaN silently
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return {key.item(): function(part) for key, part in zip(unique, parts)}
+
+
+def export(
+    directory: Optional[pathlib.Path] = None,
+    paths: Optional[Iterable[pathlib.Path]] = None,
+    workers: Optional[int] = None,
+) -> pathlib.Path:
+    """Flatten producers (default: every cached producer) and save their columns"""
+    return Columns.from_producers(paths, workers).save(directory)
+
+
+def main():
+    directory = export()
+    columns = Columns.load(directory)
+    print(f"{len(columns)} rows exported to {directory}")
+
+
+if __name__ == "__main__":
+    main()
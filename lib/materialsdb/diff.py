@@ -0,0 +1,224 @@
+# coding: UTF-8
+"""This module compares two versions of a producer material by material.
+
+Materials are matched by id and layers by layer id. Lists of per-country or localized
+values are matched by their lang, country and name attributes, other lists by
+position.
+Each modified material comes with its field level changes so builders can update only
+what changed instead of rebuilding the whole producer.
+"""
+import dataclasses
+import functools
+import typing
+from collections import namedtuple
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+from materialsdb import classes
+from materialsdb.serialiser import XmlDeserialiser, strip_optional
+
+# path: field names and list keys (layer id, (lang, country, name) of localized values
+# or position) leading to the changed value. old or new is None if it was added or
+# removed
+Change = namedtuple("Change", ["path", "old", "new"])
+MaterialDiff = namedtuple("MaterialDiff", ["old", "new", "changes"])
+ProducerDiff = namedtuple(
+    "ProducerDiff", ["added", "modified", "removed", "unchanged", "header"]
+)
+KEY_ATTRIBUTES = ("lang", "country", "name")
+
+
+def item_key(item: Any) -> Hashable:
+    """Key matching an item of a list in another version of the list"""
+    attributes = getattr(item, "xml_attributes", ())
+    if "id" in attributes:
+        return item.id
+    return tuple(
+        getattr(item, attribute, None) or None
+        for attribute in KEY_ATTRIBUTES
+        if attribute in attributes
+    )
+
+
+def keyed(items: List[Any]) -> Optional[Dict[Hashable, Any]]:
+    """Items by key or None if keys are not unique"""
+    by_key = {item_key(item): item for item in items}
+    return by_key if len(by_key) == len(items) else None
+
+
+def compare_lists(old: List[Any], new: List[Any], path: Tuple) -> Iterator[Change]:
+    old_by_key = keyed(old)
+    new_by_key = keyed(new)
+    if old_by_key is None or new_by_key is None:
+        if len(old) != len(new):
+            yield Change(path, old, new)
+            return
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            yield from compare(old_item, new_item, path + (index,))
+        return
+    for key, old_item in old_by_key.items():
+        new_item = new_by_key.get(key)
+        if new_item is None:
+            yield Change(path + (key,), old_item, None)
+        else:
+            yield from compare(old_item, new_item, path + (key,))
+    for key, new_item in new_by_key.items():
+        if key not in old_by_key:
+            yield Change(path + (key,), None, new_item)
+
+
+@functools.lru_cache(maxsize=None)
+def get_field_names(dataclass: type) -> Optional[Tuple[str, ...]]:
+    """Field names of a dataclass, None for any other type"""
+    if not dataclasses.is_dataclass(dataclass):
+        return None
+    return tuple(field.name for field in dataclasses.fields(dataclass))
+
+
+def compare(old: Any, new: Any, path: Tuple = ()) -> Iterator[Change]:
+    """Yield changes between two versions of a value. Attributes of localized strings
+    are compared too (str equality ignores them)."""
+    if old is new:
+        return
+    field_names = get_field_names(type(old))
+    if field_names is not None and type(old) is type(new):
+        for name in field_names:
+            yield from compare(getattr(old, name), getattr(new, name), path + (name,))
+    elif isinstance(old, list) and isinstance(new, list):
+        yield from compare_lists(old, new, path)
+    elif type(old) is not type(new) or old != new:
+        yield Change(path, old, new)
+
+
+def holds_attributed(value_class: Any) -> bool:
+    """True if a value of this type hint may contain an AttributedStr"""
+    value_class = strip_optional(value_class)
+    if typing.get_origin(value_class) is list:
+        return holds_attributed(typing.get_args(value_class)[0])
+    if isinstance(value_class, type) and issubclass(value_class, classes.AttributedStr):
+        return True
+    return bool(get_attributed_fields(value_class))
+
+
+@functools.lru_cache(maxsize=None)
+def get_attributed_fields(dataclass: type) -> Tuple[str, ...]:
+    """Fields of a dataclass which may contain an AttributedStr"""
+    if not dataclasses.is_dataclass(dataclass):
+        return ()
+    type_hints = typing.get_type_hints(dataclass)
+    return tuple(
+        name
+        for name in get_field_names(dataclass)
+        if holds_attributed(type_hints[name])
+    )
+
+
+def same_attributes(old: Any, new: Any) -> bool:
+    """Compare attributes of AttributedStr of two equal values. Each distinct set of
+    attributes has its own variant class so comparing types is enough."""
+    if isinstance(old, classes.AttributedStr):
+        return type(old) is type(new)
+    if isinstance(old, list):
+        return all(map(same_attributes, old, new))
+    return all(
+        same_attributes(getattr(old, name), getattr(new, name))
+        for name in get_attributed_fields(type(old))
+    )
+
+
+def diff_material(old: classes.Material, new: classes.Material) -> List[Change]:
+    # Dataclass equality is much faster than walking fields so it is tried first
+    if old == new and same_attributes(old, new):
+        return []
+    return list(compare(old, new))
+
+
+def diff_materials(old: classes.Materials, new: classes.Materials) -> ProducerDiff:
+    """Compare materials of two versions of a producer by id in linear time.
+    added and unchanged are materials of new, removed are materials of old, modified
+    are MaterialDiff and header are changes of producer attributes"""
+    old_by_id = {material.id: material for material in old.material}
+    added = []
+    modified = []
+    unchanged = []
+    for material in new.material:
+        old_material = old_by_id.pop(material.id, None)
+        if old_material is None:
+            added.append(material)
+            continue
+        changes = diff_material(old_material, material)
+        if changes:
+            modified.append(MaterialDiff(old_material, material, changes))
+        else:
+            unchanged.append(material)
+    header = [
+        change
+        for attribute in old.xml_attributes
+        for change in compare(
+            getattr(old, attribute), getattr(new, attribute), (attribute,)
+        )
+    ]
+    return ProducerDiff(added, modified, list(old_by_id.values()), unchanged, header)
+
+
+def diff_files(
+    old_path, new_path, deserialiser: Optional[XmlDeserialiser] = None
+) -> ProducerDiff:
+    deserialiser = deserialiser or XmlDeserialiser()
+    return diff_materials(
+        deserialiser.from_xml(str(old_path)), deserialiser.from_xml(str(new_path))
+    )
+
+
+def layer_ids(material: classes.Material) -> Set[str]:
+    return {layer.id for layer in getattr(material.layers, "layer", ())}
+
+
+def changed_layers(material_diff: MaterialDiff) -> Set[str]:
+    """Ids of layers added, removed or modified in a material"""
+    layers = set()
+    for change in material_diff.changes:
+        if change.path[:2] == ("layers", "layer") and len(change.path) > 2:
+            layers.add(change.path[2])
+        elif change.path[:1] == ("layers",):
+            layers |= layer_ids(material_diff.old) | layer_ids(material_diff.new)
+    return layers
+
+
+def is_empty(producer_diff: ProducerDiff) -> bool:
+    return not (
+        producer_diff.added
+        or producer_diff.modified
+        or producer_diff.removed
+        or producer_diff.header
+    )
+
+
+def format_path(path: Tuple) -> str:
+    return "/".join(
+        "-".join(str(part) for part in key if part) or "*"
+        if isinstance(key, tuple)
+        else str(key)
+        for key in path
+    )
+
+
+def format_change(change: Change, prefix: str = "") -> str:
+    path = prefix + format_path(change.path)
+    if dataclasses.is_dataclass(change.new) and change.old is None:
+        return f"+ {path}"
+    if dataclasses.is_dataclass(change.old) and change.new is None:
+        return f"- {path}"
+    return f"~ {path}: {change.old!r} -> {change.new!r}"
+
+
+def format_diff(producer_diff: ProducerDiff) -> Iterator[str]:
+    """Human readable lines: + added, - removed and ~ modified"""
+    for change in producer_diff.header:
+        yield format_change(change)
+    for material in producer_diff.added:
+        yield f"+ {material.id}"
+    for material in producer_diff.removed:
+        yield f"- {material.id}"
+    for material_diff in producer_diff.modified:
+        for change in material_diff.changes:
+            yield format_change(change, f"{material_diff.new.id}/")
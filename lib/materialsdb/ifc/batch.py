@@ -0,0 +1,285 @@
+"""Convert every cached producer into an ifc project library using a process pool.
+
+A manifest in output directory records the SHA-256 of the source of each library and
+a stamp of the converter code and the configured lang and country so a library is
+only generated again when its producer, the converter or the configured locale
+changed. Materials a library was built from are kept next to it so with
+--incremental a changed producer only patches its library with the materials which
+have been added, removed or modified.
+
+Usage: python -m materialsdb.ifc.batch [--output DIR] [--workers N] [--force]
+    [--incremental]
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import ifcopenshell
+
+from materialsdb import cache, classes, config, snapshot
+from materialsdb.ifc import project_library
+
+MANIFEST_NAME = "manifest.json"
+CONVERTER_FILES = ("project_library.py", "entity_pool.py", "material_psets.json")
+
+ConversionResult = namedtuple(
+    "ConversionResult", ["path", "output", "status", "duration", "error", "source"]
+)
+
+
+def get_output_dir() -> pathlib.Path:
+    return cache.get_cache_folder() / "Ifc"
+
+
+@functools.lru_cache(maxsize=None)
+def get_converter_stamp() -> str:
+    """Libraries are generated again when conversion code or classes change"""
+    sha256 = hashlib.sha256(snapshot.get_classes_stamp().encode("utf-8"))
+    folder = pathlib.Path(project_library.__file__).parent
+    for name in CONVERTER_FILES:
+        sha256.update((folder / name).read_bytes())
+    return sha256.hexdigest()
+
+
+def get_locale() -> Dict[str, str]:
+    """Language and country libraries are converted for"""
+    return {"lang": config.get_lang(), "country": config.get_country()}
+
+
+def is_current(entry: Optional[Dict[str, Any]], locale: Dict[str, str]) -> bool:
+    """Library has been generated by the same converter for the same locale"""
+    return bool(
+        entry
+        and entry.get("stamp") == get_converter_stamp()
+        and all(entry.get(key) == value for key, value in locale.items())
+    )
+
+
+def get_output_path(xml_path: pathlib.Path, output_dir: pathlib.Path) -> pathlib.Path:
+    return output_dir / f"{xml_path.stem}.ifc"
+
+
+def get_source_path(output: pathlib.Path) -> pathlib.Path:
+    return output.with_name(f"{output.stem}.source.pickle")
+
+
+def read_source(output: pathlib.Path) -> classes.Materials:
+    with get_source_path(output).open("rb") as file:
+        return pickle.load(file)
+
+
+def write_source(output: pathlib.Path, source: classes.Materials) -> None:
+    with cache.replacing(get_source_path(output)) as temp_path:
+        with temp_path.open("wb") as file:
+            pickle.dump(source, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def can_patch(
+    entry: Optional[Dict[str, Any]],
+    output: pathlib.Path,
+    locale: Optional[Dict[str, str]] = None,
+) -> bool:
+    """Library exists and has been built by the same converter for the same locale
+    from known materials"""
+    return (
+        is_current(entry, locale or get_locale())
+        and output.exists()
+        and get_source_path(output).exists()
+    )
+
+
+def read_manifest(output_dir: pathlib.Path) -> Dict[str, Dict[str, Any]]:
+    path = output_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text("utf-8"))
+    except ValueError:
+        return {}
+
+
+def write_manifest(output_dir: pathlib.Path, manifest: Dict[str, Dict[str, Any]]):
+    with cache.replacing(output_dir / MANIFEST_NAME) as temp_path:
+        temp_path.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+
+
+def is_up_to_date(
+    entry: Optional[Dict[str, Any]],
+    xml_path: pathlib.Path,
+    output: pathlib.Path,
+    locale: Optional[Dict[str, str]] = None,
+) -> bool:
+    """Source hash is only computed if modification time changed. entry then gets the
+    new modification time so a touched but identical source is not hashed again."""
+    if not is_current(entry, locale or get_locale()):
+        return False
+    if not output.exists():
+        return False
+    return cache.is_unchanged(entry, xml_path)
+
+
+def patch_library(output: pathlib.Path, materials: classes.Materials):
+    file = ifcopenshell.open(str(output))
+    project_library.patch_project_library(file, read_source(output), materials)
+    return file
+
+
+def convert(
+    xml_path: pathlib.Path, output: pathlib.Path, patch: bool
+) -> Tuple[str, Optional[str], Dict[str, Any]]:
+    """Return status, error of a failed patch and source key"""
+    status = "converted"
+    error = None
+    source = snapshot.get_source_key(xml_path)
+    materials = snapshot.load(xml_path)
+    file = None
+    if patch:
+        try:
+            file = patch_library(output, materials)
+            status = "patched"
+        except Exception as err:  # A full build is still possible
+            error = f"patch failed, rebuilt: {type(err).__name__}: {err}"
+    if file is None:
+        file = project_library.build_project_library(materials)
+    with cache.replacing(output) as temp_path:
+        file.write(str(temp_path))
+    write_source(output, materials)
+    return status, error, source
+
+
+def convert_one(
+    xml_path: pathlib.Path, output: pathlib.Path, patch: bool = False
+) -> ConversionResult:
+    """Convert a producer in a worker process. With patch, existing library is
+    updated instead and rebuilt only if patching fails. Library is written to a
+    temporary file first so an interrupted conversion does not leave a truncated
+    library."""
+    start = time.perf_counter()
+    converted, error = cache.try_producer(convert, xml_path, output, patch)
+    duration = time.perf_counter() - start
+    if error:
+        return ConversionResult(xml_path, output, "failed", duration, error, None)
+    status, error, source = converted
+    return ConversionResult(xml_path, output, status, duration, error, source)
+
+
+def convert_producers(
+    paths: Optional[Iterable[pathlib.Path]] = None,
+    output_dir: Optional[pathlib.Path] = None,
+    workers: Optional[int] = None,
+    force: bool = False,
+    incremental: bool = False,
+) -> List[ConversionResult]:
+    """Convert producers (default: every cached producer) which changed since their
+    library was generated. With incremental, existing libraries are patched instead of
+    rebuilt. Results are sorted by path."""
+    if paths is None:
+        paths = cache.producers()
+    paths = sorted(pathlib.Path(path) for path in paths)
+    output_dir = pathlib.Path(output_dir or get_output_dir())
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(output_dir)
+    locale = get_locale()
+    results = {}
+    tasks = []
+    for path in paths:
+        output = get_output_path(path, output_dir)
+        entry = manifest.get(path.name)
+        if not force and is_up_to_date(entry, path, output, locale):
+            results[path] = ConversionResult(path, output, "skipped", 0.0, None, None)
+        else:
+            tasks.append(
+                (path, output, incremental and can_patch(entry, output, locale))
+            )
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        converted = [convert_one(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            converted = list(executor.map(convert_one, *zip(*tasks)))
+    for result in converted:
+        results[result.path] = result
+        if result.status != "failed":
+            manifest[result.path.name] = dict(
+                result.source,
+                stamp=get_converter_stamp(),
+                **locale,
+                output=result.output.name,
+                duration=round(result.duration, 3),
+            )
+        else:
+            manifest.pop(result.path.name, None)
+    write_manifest(output_dir, manifest)
+    return [results[path] for path in paths]
+
+
+def format_report(results: List[ConversionResult], wall_time: float) -> str:
+    """One line per producer, slowest first, and totals"""
+    lines = []
+    for result in sorted(results, key=lambda result: -result.duration):
+        line = f"{result.status:9} {result.duration:8.2f}s  {result.path.name}"
+        if result.error:
+            line += f"  {result.error}"
+        lines.append(line)
+    counts = {
+        status: sum(result.status == status for result in results)
+        for status in ("converted", "patched", "skipped", "failed")
+    }
+    busy_time = sum(result.duration for result in results)
+    summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+    summary += f" in {wall_time:.2f}s"
+    if busy_time:
+        summary += f" ({busy_time:.2f}s of conversion, {busy_time / wall_time:.1f}x)"
+    lines.append(summary)
+    return "\n".join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Convert cached materialsdb producers into ifc project libraries"
+    )
+    parser.add_argument(
+        "--output",
+        type=pathlib.Path,
+        help="output directory (default: Ifc folder of materialsdb cache)",
+    )
+    parser.add_argument(
+        "--workers", type=int, help="worker processes (default: cpu count)"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="convert up to date producers too"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="patch existing libraries with changed materials instead of rebuilding",
+    )
+    parser.add_argument(
+        "producers",
+        nargs="*",
+        type=pathlib.Path,
+        help="producer xml files (default: every cached producer)",
+    )
+    options = parser.parse_args(args)
+    start = time.perf_counter()
+    results = convert_producers(
+        options.producers or None,
+        options.output,
+        options.workers,
+        options.force,
+        options.incremental,
+    )
+    print(format_report(results, time.perf_counter() - start))
+    return 1 if any(result.status == "failed" for result in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
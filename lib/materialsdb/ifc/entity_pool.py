@@ -0,0 +1,87 @@
+"""Content-addressed pool of ifc entities.
+
+An entity is keyed by its type and attribute values, referenced entities by their id,
+so structurally identical entities (same property value, same styled item…) are
+created once and shared.
+"""
+from collections import namedtuple
+from typing import Any, Callable, Dict, Hashable, List
+
+import ifcopenshell
+
+DedupCount = namedtuple("DedupCount", ["requested", "created"])
+
+
+def freeze(value: Any) -> Hashable:
+    """Hashable key of an attribute value"""
+    if isinstance(value, ifcopenshell.entity_instance):
+        entity_id = value.id()
+        if entity_id:
+            return ("#", entity_id)
+        return (value.is_a(), freeze(value.wrappedValue))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def get_key(ifc_type: str, args: tuple, attributes: Dict[str, Any]) -> Hashable:
+    return (ifc_type, freeze(args)) + tuple(
+        sorted((name, freeze(value)) for name, value in attributes.items())
+    )
+
+
+class EntityPool:
+    """Entities of file by content. With enabled=False every request creates a new
+    entity which is useful to measure the gain."""
+
+    def __init__(self, file: ifcopenshell.file, enabled: bool = True):
+        self.file = file
+        self.enabled = enabled
+        self.entities: Dict[Hashable, Any] = {}
+        self.counts: Dict[str, List[int]] = {}
+
+    def get(self, kind: str, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Entity stored at key or a new one from factory. kind is reported in
+        counts."""
+        counts = self.counts.setdefault(kind, [0, 0])
+        counts[0] += 1
+        entity = self.entities.get(key) if self.enabled else None
+        if entity is None:
+            entity = factory()
+            counts[1] += 1
+            if self.enabled:
+                self.entities[key] = entity
+        return entity
+
+    def create(self, ifc_type: str, *args, **attributes) -> Any:
+        """file.create_entity returning an existing identical entity if any"""
+        key = get_key(ifc_type, args, attributes)
+        return self.get(
+            ifc_type,
+            key,
+            lambda: self.file.create_entity(ifc_type, *args, **attributes),
+        )
+
+    def add(self, entity, *names: str) -> None:
+        """Register an existing entity as if it had been created with its attributes
+        names"""
+        attributes = {name: getattr(entity, name) for name in names}
+        if self.enabled:
+            self.entities.setdefault(get_key(entity.is_a(), (), attributes), entity)
+
+    def report(self) -> Dict[str, DedupCount]:
+        return {kind: DedupCount(*counts) for kind, counts in self.counts.items()}
+
+    def ratio(self) -> float:
+        """Share of requested entities which have been reused"""
+        requested = sum(counts[0] for counts in self.counts.values())
+        created = sum(counts[1] for counts in self.counts.values())
+        return 1 - created / requested if requested else 0.0
+
+    def format_report(self) -> str:
+        lines = [
+            f"{kind}: {count.created}/{count.requested} created"
+            for kind, count in sorted(self.report().items())
+        ]
+        lines.append(f"dedup ratio: {self.ratio():.1%}")
+        return "\n".join(lines)
@@ -1,12 +1,15 @@
 import uuid
+import dataclasses
 import datetime
 import json
 from pathlib import Path
 import ifcopenshell
 import ifcopenshell.api
+import ifcopenshell.guid
 
 from materialsdb.serialiser import XmlDeserialiser
-from materialsdb import config, utils
+from materialsdb import config, diff, snapshot, utils
+from materialsdb.ifc.entity_pool import EntityPool
 from materialsdb.classes import (
     Materials,
     Material,
@@ -47,6 +50,17 @@ def clean_psets(psets):
 
 PSETS = json.loads(Path(__file__).with_name("material_psets.json").read_text("utf-8"))
 PSETS = clean_psets(PSETS)
+# Every ifc material gets this property which identifies its materialsdb layer
+LAYER_PSET = "materialsdb.org_layer"
+LAYER_ID_PROPERTY = "MaterialsDBLayerId"
+GUID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "http://www.materialsdb.org")
+
+
+def get_guid(*parts):
+    """GlobalId derived from parts (producer id, material id…) so every build of
+    the same producer gives the same GlobalIds"""
+    name = "/".join(str(part) for part in parts)
+    return ifcopenshell.guid.compress(uuid.uuid5(GUID_NAMESPACE, name).hex)
 
 
 def get_value(layer, definition, country=None):
@@ -60,14 +74,111 @@ def get_value(layer, definition, country=None):
     return value
 
 
+def get_style_name(color, category):
+    return f"color {color}" if color else f"category {category or 'Others'}"
+
+
+class ExtractionPlan:
+    """PSETS compiled once into a flat list of properties. Each per-country list a
+    layer property comes from (thermal, physical…) is resolved once per layer then
+    properties are read with a short chain of getattr."""
+
+    def __init__(self, psets=None):
+        psets = PSETS if psets is None else psets
+        self.pset_names = tuple(psets)
+        # layer attributes read first by property paths
+        self.sources = []
+        # (pset index, name, source index, remaining path, unit factor, measure type)
+        self.properties = []
+        for pset_index, props in enumerate(psets.values()):
+            for prop_name, definition in props.items():
+                measure_type = definition["primary_measure_type"]
+                if not measure_type:
+                    continue
+                first, *attributes = definition["path"]
+                if first not in self.sources:
+                    self.sources.append(first)
+                unit_factor = definition.get("unit_factor", None) or 1
+                self.properties.append(
+                    (
+                        pset_index,
+                        prop_name,
+                        self.sources.index(first),
+                        tuple(attributes),
+                        unit_factor if unit_factor != 1 else None,
+                        measure_type,
+                    )
+                )
+
+    def extract_many(self, layers, country=None):
+        """For each layer: [(pset name, [(property name, measure type, value), …]), …]
+        of psets having at least one value. Per-country values are those of country."""
+        get_by_country = utils.get_by_country
+        sources = self.sources
+        properties = self.properties
+        pset_names = self.pset_names
+        results = []
+        for layer in layers:
+            resolved = []
+            for source in sources:
+                value = getattr(layer, source)
+                if isinstance(value, list):
+                    value = get_by_country(value, country)
+                resolved.append(value)
+            psets = [[] for _ in pset_names]
+            for (
+                pset_index,
+                name,
+                source_index,
+                attributes,
+                factor,
+                measure,
+            ) in properties:
+                value = resolved[source_index]
+                for attribute in attributes:
+                    if not value:
+                        break
+                    value = getattr(value, attribute)
+                    if isinstance(value, list):
+                        value = get_by_country(value, country)
+                if value:
+                    if factor is not None:
+                        value = value * factor
+                    psets[pset_index].append((name, measure, value))
+            results.append(
+                [
+                    (pset_name, properties)
+                    for pset_name, properties in zip(pset_names, psets)
+                    if properties
+                ]
+            )
+        return results
+
+    def extract(self, layer, country=None):
+        return self.extract_many((layer,), country)[0]
+
+
+PLAN = ExtractionPlan()
+
+
 class ProjectLibrary:
-    def __init__(self, schema: str = "IFC4"):
-        self.file = ifcopenshell.file(schema=schema)
-        self.application = self.create_application()
+    def __init__(self, schema: str = "IFC4", dedup: bool = True, file=None):
+        """file: existing library to update instead of a new one"""
+        self.file = file or ifcopenshell.file(schema=schema)
+        applications = self.file.by_type("IfcApplication") if file else ()
+        self.application = (
+            applications[0] if applications else self.create_application()
+        )
         self.project_library = None
         self.lang = config.get_lang()
         self.country = config.get_country()
         self.owner_history = None
+        # style name: IfcSurfaceStyle so each style is created once per library
+        self.surface_styles = {}
+        self.pool = EntityPool(self.file, dedup)
+        self.context = None
+        if file:
+            self.load_existing()
 
     def create_application(self):
         file = self.file
@@ -102,7 +213,9 @@ class ProjectLibrary:
 
         # https://standards.buildingsmart.org/IFC/RELEASE/IFC4/ADD2_TC1/HTML/link/ifcperson.htm
         person = file.createIfcPerson(
-            Identification=str(uuid.uuid4()),
+            Identification=str(
+                uuid.uuid5(GUID_NAMESPACE, f"{source.companyid}/person")
+            ),
             FamilyName="Unknown",
             GivenName="Unknown",
             Roles=[role],
@@ -127,8 +240,8 @@ class ProjectLibrary:
         self.owner_history = owner_history
 
         # https://standards.buildingsmart.org/IFC/RELEASE/IFC4/ADD2_TC1/HTML/link/ifcprojectlibrary.htm
-        file.createIfcProjectLibrary(
-            GlobalId=ifcopenshell.guid.new(),
+        self.project_library = file.createIfcProjectLibrary(
+            GlobalId=get_guid(source.companyid),
             OwnerHistory=owner_history,
             Name=source.company,
             Description=f"Material library converted from materialsdb xml for company {source.company}",
@@ -138,139 +251,247 @@ class ProjectLibrary:
 
     def create_materials(self, source: Materials):
         file = self.file
-        context = file.createIfcRepresentationContext()
-        for material in utils.get_materials(source, self.country):
-            name = utils.get_material_name(material, self.lang)
-            description = utils.get_material_description(material, self.lang)
-            webinfo = utils.get_material_webinfo(material, self.lang)
+        pool = self.pool
+        context = self.get_representation_context()
+        lang = self.lang
+        country = self.country
+        for material in utils.get_materials(source, country):
+            name = utils.get_material_name(material, lang)
+            description = utils.get_material_description(material, lang)
+            webinfo = utils.get_material_webinfo(material, lang)
             category = material.information.group
             labels = material.information.labels
             color = material.information.color
             brushstyle = material.information.BrushStyle
             surface_style = self.get_surface_style(color, category)
-            styled_item = file.createIfcStyledItem(Styles=[surface_style])
+            # Styled item and representation are not attached to any material yet.
+            # Pooling them leaves one such orphan per style instead of one per material.
+            styled_item = pool.create("IfcStyledItem", Styles=[surface_style])
             # TODO: hatch_item = file.createIfcFillAreaStyleHatching()
-            representation = file.createIfcStyledRepresentation(
+            representation = pool.create(
+                "IfcStyledRepresentation",
                 ContextOfItems=context,
                 RepresentationIdentifier="Body",
                 Items=[styled_item],
             )
             for layer in getattr(getattr(material, "layers", ()), "layer", ()):
-                ifc_material = file.createIfcMaterial(name, description, category)
-                for pset_name, props in PSETS.items():
-                    properties = list()
-                    for prop_name, definition in props.items():
-                        primary_measure_type = definition["primary_measure_type"]
-                        if not primary_measure_type:
-                            continue
-                        value = get_value(layer, definition, self.country)
-                        if value:
-                            unit_factor = definition.get("unit_factor", None) or 1
-                            properties.append(
-                                file.create_entity(
-                                    "IfcPropertySingleValue",
-                                    Name=prop_name,
-                                    NominalValue=file.create_entity(
-                                        primary_measure_type, value * unit_factor
-                                    ),
-                                )
+                psets = [
+                    (
+                        pset_name,
+                        [
+                            pool.create(
+                                "IfcPropertySingleValue",
+                                Name=prop_name,
+                                NominalValue=file.create_entity(measure_type, value),
                             )
-                    if not properties:
-                        continue
-                    pset = file.create_entity(
-                        "IfcMaterialProperties",
-                        Name=pset_name,
-                        Properties=properties,
-                        Material=ifc_material,
-                    )
-                geometry = utils.get_by_country(layer.geometry, self.country)
-                if getattr(geometry, "thick", None):
-                    element_name = f"{name} | {geometry.thick}mm"
-                    ifc_layer = file.create_entity(
-                        "IfcMaterialLayer",
-                        Material=ifc_material,
-                        LayerThickness=geometry.thick / 1000,
-                        Name=element_name,
-                    )
-                    assigned_material = file.create_entity(
-                        "IfcMaterialLayerSet",
-                        MaterialLayers=[ifc_layer],
-                        LayerSetName=element_name,
-                    )
-                else:
-                    element_name = name
-                    assigned_material = ifc_material
-                if material.information.wall:
-                    wall = file.create_entity(
-                        "IfcWallType",
-                        GlobalId=ifcopenshell.guid.new(),
-                        Name=element_name,
-                    )
-                    ifcopenshell.api.run(
-                        "material.assign_material",
-                        file,
-                        product=wall,
-                        material=assigned_material,
-                    )
-                if material.information.roof:
-                    roof = file.create_entity(
-                        "IfcRoofType",
-                        GlobalId=ifcopenshell.guid.new(),
-                        Name=element_name,
+                            for prop_name, measure_type, value in values
+                        ],
                     )
-                    ifcopenshell.api.run(
-                        "material.assign_material",
-                        file,
-                        product=roof,
-                        material=assigned_material,
+                    for pset_name, values in PLAN.extract(layer, country)
+                ]
+                geometry = utils.get_by_country(layer.geometry, country)
+                thick = getattr(geometry, "thick", None)
+                element_name = f"{name} | {thick}mm" if thick else name
+                assigned_material = self.create_layer_material(
+                    name, description, category, psets, thick, element_name
+                )
+                guid_parts = (source.companyid, material.id, layer.id)
+                information = material.information
+                if information.wall:
+                    self.create_type(
+                        "IfcWallType", element_name, assigned_material, guid_parts
                     )
-                if material.information.floor:
-                    slab = file.create_entity(
-                        "IfcRoofType",
-                        GlobalId=ifcopenshell.guid.new(),
-                        Name=element_name,
+                if information.roof:
+                    self.create_type(
+                        "IfcRoofType", element_name, assigned_material, guid_parts
                     )
-                    ifcopenshell.api.run(
-                        "material.assign_material",
-                        file,
-                        product=slab,
-                        material=assigned_material,
+                if information.floor:
+                    slab = self.create_type(
+                        "IfcSlabType", element_name, assigned_material, guid_parts
                     )
-                if material.information.door:
-                    door = file.create_entity(
-                        "IfcDoorType",
-                        GlobalId=ifcopenshell.guid.new(),
-                        Name=element_name,
-                    )
-                    ifcopenshell.api.run(
-                        "material.assign_material",
-                        file,
-                        product=door,
-                        material=assigned_material,
+                    slab.PredefinedType = "FLOOR"
+                if information.door:
+                    self.create_type(
+                        "IfcDoorType", element_name, assigned_material, guid_parts
                     )
 
+    def create_layer_material(
+        self, name, description, category, psets, thick, element_name
+    ):
+        """Return IfcMaterialLayerSet if layer has a thickness else IfcMaterial"""
+        file = self.file
+        ifc_material = file.createIfcMaterial(name, description, category)
+        for pset_name, properties in psets:
+            file.create_entity(
+                "IfcMaterialProperties",
+                Name=pset_name,
+                Properties=properties,
+                Material=ifc_material,
+            )
+        if not thick:
+            return ifc_material
+        ifc_layer = file.create_entity(
+            "IfcMaterialLayer",
+            Material=ifc_material,
+            LayerThickness=thick / 1000,
+            Name=element_name,
+        )
+        return file.create_entity(
+            "IfcMaterialLayerSet",
+            MaterialLayers=[ifc_layer],
+            LayerSetName=element_name,
+        )
+
+    def create_type(self, ifc_type, name, material, guid_parts):
+        """Element type of material. GlobalIds are derived from guid_parts (producer,
+        material and layer ids)."""
+        element_type = self.file.create_entity(
+            ifc_type,
+            GlobalId=get_guid(*guid_parts, ifc_type),
+            Name=name,
+        )
+        ifcopenshell.api.run(
+            "material.assign_material",
+            self.file,
+            product=element_type,
+            material=material,
+        )
+        for association in element_type.HasAssociations:
+            if association.is_a("IfcRelAssociatesMaterial"):
+                association.GlobalId = get_guid(*guid_parts, ifc_type, "material")
+        return element_type
+
+    def get_representation_context(self):
+        if self.context is None:
+            contexts = self.file.by_type("IfcRepresentationContext")
+            if contexts:
+                self.context = contexts[0]
+            else:
+                self.context = self.file.createIfcRepresentationContext()
+        return self.context
+
+    def load_existing(self):
+        """Register entities of an existing library so they are reused"""
+        file = self.file
+        self.surface_styles.clear()
+        self.pool.entities.clear()
+        libraries = file.by_type("IfcProjectLibrary")
+        if libraries:
+            self.project_library = libraries[0]
+            self.owner_history = libraries[0].OwnerHistory
+        for surface_style in file.by_type("IfcSurfaceStyle"):
+            self.surface_styles.setdefault(surface_style.Name, surface_style)
+        pool = self.pool
+        for entity in file.by_type("IfcPropertySingleValue"):
+            pool.add(entity, "Name", "NominalValue")
+        for entity in file.by_type("IfcStyledItem"):
+            pool.add(entity, "Styles")
+        for entity in file.by_type("IfcStyledRepresentation"):
+            pool.add(entity, "ContextOfItems", "RepresentationIdentifier", "Items")
+
+    def layer_materials(self):
+        """materialsdb layer id: IfcMaterial of the library"""
+        materials = {}
+        for properties in self.file.by_type("IfcMaterialProperties"):
+            if properties.Name != LAYER_PSET:
+                continue
+            for prop in properties.Properties:
+                if prop.Name == LAYER_ID_PROPERTY:
+                    materials[prop.NominalValue.wrappedValue] = properties.Material
+        return materials
+
+    def remove_materials(self, materials):
+        """Remove ifc materials, layers, properties and element types of materials.
+        Properties and owner histories which are not used anymore are removed too."""
+        file = self.file
+        layer_materials = self.layer_materials()
+        orphans = []
+        for material in materials:
+            for layer in getattr(getattr(material, "layers", ()), "layer", ()):
+                ifc_material = layer_materials.pop(layer.id, None)
+                if ifc_material is not None:
+                    orphans.extend(self.remove_layer_material(ifc_material))
+        orphans = {entity.id(): entity for entity in orphans}
+        for entity in orphans.values():
+            if entity != self.owner_history and not file.get_total_inverses(entity):
+                file.remove(entity)
+        # Removed entities may have been pooled
+        self.load_existing()
+
+    def remove_layer_material(self, ifc_material):
+        """Remove ifc_material and entities depending on it. Return shared entities
+        which may be orphans now."""
+        file = self.file
+        orphans = []
+        definitions = [ifc_material]
+        for inverse in file.get_inverse(ifc_material):
+            if inverse.is_a("IfcMaterialLayer"):
+                definitions.extend(file.get_inverse(inverse))
+                definitions.append(inverse)
+        for definition in definitions:
+            for inverse in file.get_inverse(definition):
+                if inverse.is_a("IfcRelAssociatesMaterial"):
+                    for element_type in inverse.RelatedObjects:
+                        orphans.append(element_type.OwnerHistory)
+                        file.remove(element_type)
+                    orphans.append(inverse.OwnerHistory)
+                    file.remove(inverse)
+                elif inverse.is_a("IfcMaterialProperties"):
+                    orphans.extend(inverse.Properties)
+                    file.remove(inverse)
+        for definition in reversed(definitions):
+            file.remove(definition)
+        return [entity for entity in orphans if entity is not None]
+
+    def remove_unused_styles(self, source: Materials):
+        """Remove surface styles (and their styled items and representations) which no
+        material of source uses"""
+        file = self.file
+        used = {
+            get_style_name(material.information.color, material.information.group)
+            for material in utils.get_materials(source, self.country)
+        }
+        for name, surface_style in list(self.surface_styles.items()):
+            if name in used:
+                continue
+            for styled_item in file.get_inverse(surface_style):
+                for representation in file.get_inverse(styled_item):
+                    file.remove(representation)
+                file.remove(styled_item)
+            shadings = surface_style.Styles
+            file.remove(surface_style)
+            for shading in shadings:
+                colour = shading.SurfaceColour
+                if not file.get_total_inverses(shading):
+                    file.remove(shading)
+                if not file.get_total_inverses(colour):
+                    file.remove(colour)
+        self.load_existing()
+
+    def update_project_library(self, source: Materials):
+        """Update library entity to a new version of its producer"""
+        library = self.project_library
+        library.Name = source.company
+        library.Description = f"Material library converted from materialsdb xml for company {source.company}"
+        library.LongName = f"{source.company} version {source.ver}"
+
     def get_surface_style(self, color, category):
+        if not color and not category:
+            category = "Others"
+        name = get_style_name(color, category)
+        surface_style = self.surface_styles.get(name)
+        if surface_style is None:
+            surface_style = self.create_surface_style(name, color, category)
+            self.surface_styles[name] = surface_style
+        return surface_style
+
+    def create_surface_style(self, name, color, category):
         file = self.file
         if color:
-            name = f"color {color}"
-            style = file.createIfcSurfaceStyleShading(
-                SurfaceColour=self.color_xml_to_ifc(color)
-            )
+            colour = self.color_xml_to_ifc(color)
         else:
-            if not category:
-                category = "Others"
-            name = f"category {category}"
-            for style in file.by_type("IfcSurfaceStyle"):
-                if style.Name == name:
-                    return style
-            style = file.createIfcSurfaceStyleShading(
-                SurfaceColour=self.file.createIfcColourRgb(
-                    None, *CATEGORIES[category]["color"]
-                ),
-            )
-        for surface_style in file.by_type("IfcSurfaceStyle"):
-            if surface_style.Name == name:
-                return surface_style
+            colour = file.createIfcColourRgb(None, *CATEGORIES[category]["color"])
+        style = file.createIfcSurfaceStyleShading(SurfaceColour=colour)
         return file.createIfcSurfaceStyle(Name=name, Side="BOTH", Styles=[style])
 
     def color_xml_to_ifc(self, color: int):
@@ -281,15 +502,44 @@ class ProjectLibrary:
         )
 
 
-def create_project_library_from_xml(xml_path):
+def build_project_library(source: Materials):
     library = ProjectLibrary()
-    deserialiser = XmlDeserialiser()
-    source = deserialiser.from_xml(str(xml_path))
     library.create_project_library(source)
     library.create_materials(source)
     return library.file
 
 
+def patch_project_library(file, old_source: Materials, source: Materials):
+    """Update file, a library built from old_source, to source: only materials which
+    have been added, removed or modified are removed and created again. Return the
+    diff applied."""
+    changes = diff.diff_materials(old_source, source)
+    library = ProjectLibrary(file=file)
+    library.remove_materials(
+        changes.removed + [material_diff.old for material_diff in changes.modified]
+    )
+    library.update_project_library(source)
+    library.create_materials(
+        dataclasses.replace(
+            source,
+            material=changes.added
+            + [material_diff.new for material_diff in changes.modified],
+        )
+    )
+    library.remove_unused_styles(source)
+    return changes
+
+
+def create_project_library_from_xml(xml_path, stream: bool = False):
+    """stream=True decodes materials one at a time to keep memory bounded on huge
+    catalogues instead of loading the whole producer"""
+    if stream:
+        source = XmlDeserialiser().stream(str(xml_path))
+    else:
+        source = snapshot.load(xml_path)
+    return build_project_library(source)
+
+
 def main():
     file = create_project_library_from_xml("example_v103.xml")
     file.write("example_v103.xml")
@@ -0,0 +1,228 @@
+# coding: UTF-8
+"""This module indexes byte offsets of <material> elements in cached producer files.
+
+Index maps material id, names and group to the slice of its producer file. A single
+material is then read by memory mapping the file and parsing only its fragment instead
+of the whole producer. Index is persisted in cache folder and a producer is indexed
+again only when its size or modification time changes.
+"""
+import functools
+import json
+import mmap
+import pathlib
+import re
+from collections import namedtuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import quoteattr
+
+from lxml import etree
+
+from materialsdb import cache, classes
+from materialsdb.serialiser import LazyMaterial, get_plan
+
+INDEX_VERSION = 2
+MATERIAL_START = re.compile(rb"<(?:[\w.-]+:)?material[\s>]")
+MATERIAL_END = re.compile(rb"</(?:[\w.-]+:)?material\s*>")
+ENCODING = re.compile(rb"""^<\?xml[^>]*encoding=["']([A-Za-z0-9._-]+)["']""")
+
+Entry = namedtuple("Entry", ["id", "path", "start", "end", "group", "names"])
+
+
+def get_offsets_path() -> pathlib.Path:
+    return cache.get_cache_folder() / "offsets.json"
+
+
+def get_encoding(data) -> str:
+    match = ENCODING.match(data[:200])
+    return match.group(1).decode("ascii") if match else "utf-8"
+
+
+def scan(data) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) byte offsets of every material element of a producer"""
+    position = 0
+    while True:
+        start = MATERIAL_START.search(data, position)
+        if not start:
+            return
+        end = MATERIAL_END.search(data, start.end())
+        if not end:
+            return
+        yield start.start(), end.end()
+        position = end.end()
+
+
+def get_namespaces(path: pathlib.Path) -> Dict[str, str]:
+    """Namespace declarations of producer root by prefix ("" for default namespace)"""
+    try:
+        for _, root in etree.iterparse(str(path), events=("start",)):
+            return {prefix or "": uri for prefix, uri in root.nsmap.items()}
+    except etree.XMLSyntaxError:
+        pass
+    return {}
+
+
+def parse_fragment(
+    fragment: bytes,
+    encoding: str = "utf-8",
+    namespaces: Optional[Dict[str, str]] = None,
+) -> etree._Element:
+    """Fragment is parsed inside an element declaring namespaces of producer root so
+    prefixed tags and attributes resolve as they do in the whole document"""
+    declarations = "".join(
+        f" xmlns:{prefix}={quoteattr(uri)}" if prefix else f" xmlns={quoteattr(uri)}"
+        for prefix, uri in (namespaces or {}).items()
+    )
+    document = b"".join(
+        (
+            f"<fragment{declarations}>".encode(encoding),
+            fragment,
+            "</fragment>".encode(encoding),
+        )
+    )
+    return etree.fromstring(document, etree.XMLParser(encoding=encoding))[0]
+
+
+def read_fragment(path: pathlib.Path, start: int, end: int) -> bytes:
+    with path.open("rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return data[start:end]
+
+
+def index_file(path: pathlib.Path) -> Dict[str, Any]:
+    """Return index record of a producer file: its encoding, root namespaces, size,
+    modification time and [id, start, end, group, [[lang, name], …]] of each material"""
+    record: Dict[str, Any] = cache.stat_entry(path)
+    record["materials"] = []
+    if not record["size"]:
+        record["encoding"] = "utf-8"
+        record["namespaces"] = {}
+        return record
+    record["namespaces"] = namespaces = get_namespaces(path)
+    with path.open("rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            record["encoding"] = encoding = get_encoding(data)
+            for start, end in scan(data):
+                try:
+                    material = LazyMaterial(
+                        parse_fragment(data[start:end], encoding, namespaces)
+                    )
+                    information = material.information
+                except (etree.XMLSyntaxError, TypeError, ValueError) as err:
+                    print(f"{path.name}: material at byte {start} is ignored: {err}")
+                    continue
+                names = information.names.name if information.names else []
+                record["materials"].append(
+                    [
+                        material.id,
+                        start,
+                        end,
+                        information.group,
+                        [[getattr(name, "lang", None), str(name)] for name in names],
+                    ]
+                )
+    return record
+
+
+class OffsetIndex:
+    """Byte offsets of materials of every cached producer"""
+
+    def __init__(self, path: Optional[pathlib.Path] = None):
+        self.path = path or get_offsets_path()
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                content = json.loads(self.path.read_text("utf-8"))
+            except ValueError:
+                content = {}
+            if content.get("version") == INDEX_VERSION:
+                self.files = content["files"]
+        self.by_id: Dict[str, Entry] = {}
+        self.build_lookup()
+
+    def build_lookup(self) -> None:
+        self.by_id = {entry.id: entry for entry in self.entries()}
+
+    def entries(self) -> Iterator[Entry]:
+        for path, record in self.files.items():
+            for id, start, end, group, names in record["materials"]:
+                yield Entry(id, path, start, end, group, names)
+
+    def refresh(self, paths: Optional[Iterable[pathlib.Path]] = None) -> List[str]:
+        """Index new and modified producers (default: every cached producer) and forget
+        deleted ones. Return paths which have been indexed."""
+        if paths is None:
+            paths = cache.producers()
+        paths = {
+            str(pathlib.Path(path).resolve()): pathlib.Path(path) for path in paths
+        }
+        indexed = []
+        for key in set(self.files) - set(paths):
+            del self.files[key]
+        for key, path in paths.items():
+            record = self.files.get(key)
+            if record and cache.is_unchanged(record, path):
+                continue
+            self.files[key] = index_file(path)
+            indexed.append(key)
+        if indexed or len(self.files) != len(paths):
+            self.save()
+        self.build_lookup()
+        return indexed
+
+    def save(self) -> None:
+        content = {"version": INDEX_VERSION, "files": self.files}
+        with cache.replacing(self.path) as temp_path:
+            temp_path.write_text(json.dumps(content), encoding="utf-8")
+
+    def lookup(self, id: str) -> Optional[Entry]:
+        return self.by_id.get(id)
+
+    def find(
+        self, name: Optional[str] = None, group: Optional[str] = None
+    ) -> List[Entry]:
+        """Entries whose name in any language contains name (case insensitive) and
+        which belong to group"""
+        name = name.casefold() if name else None
+        return [
+            entry
+            for entry in self.entries()
+            if (group is None or entry.group == group)
+            and (
+                name is None or any(name in text.casefold() for _, text in entry.names)
+            )
+        ]
+
+    def load(self, entry: Entry) -> classes.Material:
+        """Decode a single material reading only its bytes"""
+        record = self.files[entry.path]
+        fragment = read_fragment(pathlib.Path(entry.path), entry.start, entry.end)
+        element = parse_fragment(fragment, record["encoding"], record["namespaces"])
+        return get_plan(classes.Material).decode(element)
+
+    def get_material(self, id: str) -> Optional[classes.Material]:
+        entry = self.lookup(id)
+        return self.load(entry) if entry else None
+
+
+@functools.lru_cache(maxsize=None)
+def load_index(path: pathlib.Path) -> OffsetIndex:
+    index = OffsetIndex(path)
+    index.refresh()
+    return index
+
+
+def get_material(id: str, refresh: bool = False) -> Optional[classes.Material]:
+    """Return material with id from any cached producer. Index is read and refreshed
+    once per process, then only the producer holding id is checked for modification.
+    refresh indexes producers added or modified since first."""
+    index = load_index(get_offsets_path())
+    if refresh:
+        index.refresh()
+    entry = index.lookup(id)
+    if entry and not is_current(index.files[entry.path], pathlib.Path(entry.path)):
+        index.refresh()
+    return index.get_material(id)
+
+
+def is_current(record: Dict[str, Any], path: pathlib.Path) -> bool:
+    return path.exists() and cache.is_unchanged(record, path)
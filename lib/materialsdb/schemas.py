@@ -0,0 +1,110 @@
+# coding: UTF-8
+"""This module is a process wide registry of materialsdb xml schemas.
+
+Each schema is compiled at most once per process. Document schema version is detected
+from its root so 1.02 and 1.03 files are validated against the right schema.
+"""
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from lxml import etree
+
+SCHEMA_DIR = Path(__file__).parent / "schema"
+SCHEMA_FILES = {
+    "102": "materialsdb102.xsd",
+    "103": "materialsdb103.xsd",
+    "index100": "MaterialsDBIndex100.xsd",
+}
+DEFAULT_VERSION = "103"
+# 1.02 and index schemas use a different namespace case than 1.03
+NAMESPACES = {
+    "http://www.materialsdb.org": "103",
+    "http://www.materialsDB.org": "102",
+}
+XSI_NAMESPACE = "http://www.w3.org/2001/XMLSchema-instance"
+
+ValidationResult = namedtuple("ValidationResult", ["version", "valid", "errors"])
+
+_schemas: Dict[str, etree.XMLSchema] = {}
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_schema_path(version: str = DEFAULT_VERSION) -> Path:
+    return SCHEMA_DIR / SCHEMA_FILES[version]
+
+
+def get_schema(version: str = DEFAULT_VERSION) -> etree.XMLSchema:
+    schema = _schemas.get(version)
+    if schema is None:
+        with _lock:
+            schema = _schemas.get(version)
+            if schema is None:
+                schema = etree.XMLSchema(file=str(get_schema_path(version)))
+                _schemas[version] = schema
+    return schema
+
+
+def get_root(source) -> etree._Element:
+    if isinstance(source, etree._ElementTree):
+        return source.getroot()
+    if isinstance(source, etree._Element):
+        return source
+    for _, root in etree.iterparse(str(source), events=("start",)):
+        return root
+    raise ValueError(f"{source}: document has no root element")
+
+
+def detect_version(source) -> str:
+    """Detect schema version of a path, tree or root element from its schema location
+    (e.g. …/materialsdb102.xsd) or else from its namespace"""
+    root = get_root(source)
+    if etree.QName(root).localname == "MaterialsDBIndex":
+        return "index100"
+    location = (
+        root.get(f"{{{XSI_NAMESPACE}}}schemaLocation")
+        or root.get("SchemaLocation")
+        or root.nsmap.get("SchemaLocation")
+        or ""
+    )
+    for version, file_name in SCHEMA_FILES.items():
+        if Path(file_name).stem.lower() in location.lower():
+            return version
+    return NAMESPACES.get(etree.QName(root).namespace, DEFAULT_VERSION)
+
+
+def validate(
+    source: Union[str, Path, etree._ElementTree], version: Optional[str] = None
+) -> ValidationResult:
+    """Validate a path or a parsed tree against its detected schema version"""
+    if isinstance(source, (str, Path)):
+        source = etree.parse(str(source))
+    version = version or detect_version(source)
+    schema = get_schema(version)
+    valid = schema.validate(source)
+    errors = [f"line {error.line}: {error.message}" for error in schema.error_log]
+    return ValidationResult(version, valid, errors)
+
+
+def assert_valid(source, version: Optional[str] = None) -> None:
+    """Raise etree.DocumentInvalid if source is not valid"""
+    if isinstance(source, (str, Path)):
+        source = etree.parse(str(source))
+    get_schema(version or detect_version(source)).assertValid(source)
+
+
+def validate_in_background(
+    source: Union[str, Path], version: Optional[str] = None
+) -> "Future[ValidationResult]":
+    """Validate source in a background thread. lxml releases the GIL while parsing and
+    validating so it does not slow down deserialisation running meanwhile"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="materialsdb-validation"
+            )
+    return _executor.submit(validate, source, version)
@@ -0,0 +1,335 @@
+# coding: UTF-8
+"""This module is a fuzzy full text search over material names and explanations.
+
+Every localized name and explanation of every cached producer is split into trigrams of
+its accent and case folded words. An inverted index (trigram: documents) is kept per
+producer and persisted in cache folder so a producer is indexed again only when its
+size or modification time changes. Hits are ranked by trigram similarity (Dice
+coefficient) so misspelled or partial queries still find materials.
+"""
+import bisect
+import functools
+import heapq
+import pathlib
+import pickle
+import re
+import unicodedata
+from collections import namedtuple
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from materialsdb import cache
+from materialsdb.serialiser import XmlDeserialiser
+
+INDEX_VERSION = 1
+WORD = re.compile(r"\w+")
+NON_ZERO = re.compile(rb"[^\x00]")
+KINDS = ("name", "explanation")
+# Document fields: id, kind, lang, country, text, size (count of distinct trigrams)
+KIND, LANG, COUNTRY, SIZE = 1, 2, 3, 5
+
+Hit = namedtuple("Hit", ["score", "id", "producer", "kind", "lang", "country", "text"])
+
+
+def get_search_index_path() -> pathlib.Path:
+    return cache.get_cache_folder() / "search.pickle"
+
+
+def normalise(text: str) -> str:
+    """Case fold and strip accents: "Matériau" -> "materiau" """
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Trigrams of each word padded with 2 leading and 1 trailing spaces so word
+    beginnings weigh more than endings"""
+    grams = set()
+    for word in WORD.findall(normalise(text)):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def to_bits(indices: Iterable[int], length: int) -> int:
+    """Bitset of indices as an int (bit i is set if i is in indices)"""
+    data = bytearray((length + 7) // 8)
+    for index in indices:
+        data[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(data, "little")
+
+
+def bit_indices(bits: int) -> Iterator[int]:
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for match in NON_ZERO.finditer(data):
+        byte_index = match.start()
+        byte = data[byte_index]
+        for bit in range(8):
+            if byte >> bit & 1:
+                yield byte_index * 8 + bit
+
+
+def add_bits(planes: List[int], bits: int) -> None:
+    """Add 1 to the bit-sliced counter of every document set in bits"""
+    carry = bits
+    for plane_index, plane in enumerate(planes):
+        planes[plane_index] = plane ^ carry
+        carry &= plane
+        if not carry:
+            return
+    planes.append(carry)
+
+
+def equal_bits(planes: List[int], count: int, universe: int) -> int:
+    """Bitset of documents whose bit-sliced counter equals count"""
+    if count >> len(planes):
+        return 0
+    bits = universe
+    for plane_index, plane in enumerate(planes):
+        bits &= plane if count >> plane_index & 1 else universe ^ plane
+    return bits
+
+
+def index_file(path: pathlib.Path, deserialiser: XmlDeserialiser) -> Dict[str, Any]:
+    """Return index segment of a producer: its size, modification time, documents
+    (id, kind, lang, country, text, trigrams count) and postings (trigram: bitset of
+    documents)"""
+    segment: Dict[str, Any] = cache.stat_entry(path)
+    documents: List[Tuple[str, str, Optional[str], Optional[str], str, int]] = []
+    postings: Dict[str, List[int]] = {}
+    load = functools.partial(deserialiser.from_xml, lazy=True)
+    producer, error = cache.try_producer(load, str(path))
+    if error:
+        print(f"{path.name}: search indexing failed: {error}")
+    materials = producer.material if producer else []
+    for material in materials:
+        information = material.information
+        texts = (
+            ("name", getattr(information.names, "name", ())),
+            ("explanation", getattr(information.explanations, "explanation", ())),
+        )
+        for kind, values in texts:
+            for value in values:
+                grams = trigrams(value)
+                if not grams:
+                    continue
+                for gram in grams:
+                    postings.setdefault(gram, []).append(len(documents))
+                lang = getattr(value, "lang", None)
+                country = getattr(value, "country", None)
+                documents.append(
+                    (
+                        str(material.id),
+                        kind,
+                        str(lang) if lang else None,
+                        str(country) if country else None,
+                        str(value),
+                        len(grams),
+                    )
+                )
+    segment["documents"] = documents
+    segment["postings"] = {
+        gram: to_bits(indices, len(documents)) for gram, indices in postings.items()
+    }
+    fields: Dict[Tuple[int, Any], List[int]] = {}
+    for index, document in enumerate(documents):
+        for field in (KIND, LANG, COUNTRY, SIZE):
+            fields.setdefault((field, document[field]), []).append(index)
+    segment["fields"] = {
+        key: to_bits(indices, len(documents)) for key, indices in fields.items()
+    }
+    return segment
+
+
+class SearchIndex:
+    """Trigram index of names and explanations of every cached producer.
+    Segments are concatenated in memory on first search so every document has a
+    global number and trigram postings are bitsets over all documents."""
+
+    def __init__(self, path: Optional[pathlib.Path] = None):
+        self.path = path or get_search_index_path()
+        self.segments: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            try:
+                with self.path.open("rb") as file:
+                    content = pickle.load(file)
+            except (OSError, EOFError, pickle.UnpicklingError) as err:
+                print(
+                    f"{self.path.name}: search index is unreadable and is ignored: {err}"
+                )
+                content = {}
+            if content.get("version") == INDEX_VERSION:
+                self.segments = content["segments"]
+        self.documents: Optional[List[Tuple[Any, ...]]] = None
+        self.bases: List[int] = []
+        self.producers: List[str] = []
+        self.bits: Dict[Any, int] = {}
+
+    def save(self) -> None:
+        content = {"version": INDEX_VERSION, "segments": self.segments}
+        with cache.replacing(self.path) as temp_path, temp_path.open("wb") as file:
+            pickle.dump(content, file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.documents = None
+
+    def index(self, paths: Iterable[pathlib.Path]) -> List[str]:
+        """Index given producers if new or modified. Return paths which have been
+        indexed."""
+        deserialiser = XmlDeserialiser()
+        indexed = []
+        for path in paths:
+            path = pathlib.Path(path)
+            key = str(path.resolve())
+            segment = self.segments.get(key)
+            if segment and cache.is_unchanged(segment, path):
+                continue
+            self.segments[key] = index_file(path, deserialiser)
+            indexed.append(key)
+        return indexed
+
+    def remove(self, paths: Iterable[pathlib.Path]) -> List[str]:
+        removed = []
+        for path in paths:
+            key = str(pathlib.Path(path).resolve())
+            if self.segments.pop(key, None) is not None:
+                removed.append(key)
+        return removed
+
+    def refresh(self, paths: Optional[Iterable[pathlib.Path]] = None) -> List[str]:
+        """Index new and modified producers (default: every cached producer) and forget
+        missing ones. Return paths which have been indexed."""
+        if paths is None:
+            paths = cache.producers()
+        paths = [pathlib.Path(path) for path in paths]
+        keys = {str(path.resolve()) for path in paths}
+        removed = self.remove(key for key in list(self.segments) if key not in keys)
+        indexed = self.index(paths)
+        if indexed or removed:
+            self.save()
+        return indexed
+
+    def update(self, report: cache.Report) -> List[str]:
+        """Apply a cache update report. Return paths which have been indexed."""
+        removed = self.remove(
+            path for path in report.deleted if path not in report.updated
+        )
+        indexed = self.index(list(report.updated) + list(report.existing))
+        if indexed or removed:
+            self.save()
+        return indexed
+
+    def prepare(self) -> List[Tuple[Any, ...]]:
+        """Concatenate segments documents. Bitsets are merged lazily per key."""
+        if self.documents is None:
+            self.documents = []
+            self.bases = []
+            self.producers = []
+            for producer, segment in self.segments.items():
+                self.bases.append(len(self.documents))
+                self.producers.append(producer)
+                self.documents.extend(segment["documents"])
+            self.bits = {}
+        return self.documents
+
+    def merged_bits(self, table: str, key: Any) -> int:
+        """Bitset over all documents merged from segments bitsets"""
+        bits = self.bits.get(key)
+        if bits is None:
+            bits = 0
+            for base, segment in zip(self.bases, self.segments.values()):
+                segment_bits = segment[table].get(key)
+                if segment_bits:
+                    bits |= segment_bits << base
+            self.bits[key] = bits
+        return bits
+
+    def gram_bits(self, gram: str) -> int:
+        return self.merged_bits("postings", gram)
+
+    def field_bits(self, field: int, value: Any) -> int:
+        """Bitset of documents whose field (KIND, LANG, COUNTRY, SIZE) equals value"""
+        return self.merged_bits("fields", (field, value))
+
+    def sizes(self) -> List[int]:
+        sizes = self.bits.get(SIZE)
+        if sizes is None:
+            sizes = self.bits[SIZE] = sorted(
+                {
+                    value
+                    for segment in self.segments.values()
+                    for field, value in segment["fields"]
+                    if field == SIZE
+                }
+            )
+        return sizes
+
+    def search(
+        self,
+        query: str,
+        lang: Optional[str] = None,
+        country: Optional[str] = None,
+        kinds: Iterable[str] = KINDS,
+        limit: int = 20,
+        min_score: float = 0.3,
+    ) -> List[Hit]:
+        """Materials best matching query, best hit of each material only.
+        lang, country: only texts in this language / for this country (or for any
+        country)
+        kinds: "name" and/or "explanation"
+        min_score: minimum Dice coefficient between query and text trigrams"""
+        grams = trigrams(query)
+        documents = self.prepare()
+        if not grams or not documents:
+            return []
+        universe = 0
+        for kind in kinds:
+            universe |= self.field_bits(KIND, kind)
+        if lang is not None:
+            universe &= self.field_bits(LANG, lang)
+        if country is not None:
+            universe &= self.field_bits(COUNTRY, country) | self.field_bits(
+                COUNTRY, None
+            )
+        planes: List[int] = []
+        for gram in grams:
+            bits = self.gram_bits(gram) & universe
+            if bits:
+                add_bits(planes, bits)
+        query_size = len(grams)
+        best: Dict[str, Hit] = {}
+        threshold = min_score
+        # Documents sharing count trigrams score at most 2 * count / (query + count)
+        # reached by the smallest documents. Levels are visited from best to worst and
+        # documents of each level from smallest to largest until limit is reached.
+        for count in range(min(query_size, 2 ** len(planes) - 1), 0, -1):
+            if 2 * count / (query_size + count) < threshold:
+                break
+            level = equal_bits(planes, count, universe)
+            if not level:
+                continue
+            for size in self.sizes():
+                if size < count:
+                    continue
+                score = 2 * count / (query_size + size)
+                if score < threshold:
+                    break
+                for index in bit_indices(level & self.field_bits(SIZE, size)):
+                    self.add_hit(best, index, score)
+                if len(best) >= limit:
+                    scores = heapq.nlargest(limit, (hit.score for hit in best.values()))
+                    threshold = max(min_score, scores[-1])
+        hits = sorted(best.values(), key=lambda hit: (-hit.score, hit.text))
+        return hits[:limit]
+
+    def add_hit(self, best: Dict[str, Hit], index: int, score: float) -> None:
+        id, kind, lang, country, text, _ = self.documents[index]
+        previous = best.get(id)
+        if previous is None or score > previous.score:
+            producer = self.producers[bisect.bisect_right(self.bases, index) - 1]
+            best[id] = Hit(score, id, pathlib.Path(producer), kind, lang, country, text)
+
+
+def search(query: str, refresh: bool = True, **kwargs) -> List[Hit]:
+    """Search every cached producer. See SearchIndex.search for kwargs"""
+    index = SearchIndex()
+    if refresh:
+        index.refresh()
+    return index.search(query, **kwargs)
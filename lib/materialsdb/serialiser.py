@@ -8,18 +8,33 @@ See the LICENSE.md file for more details.
 
 Author : Cyril Waechter
 """
+import dataclasses
+import functools
 import re
+from collections import namedtuple
+from concurrent.futures import Future
 from pathlib import Path
 import typing
-from typing import Protocol, Tuple, Dict, Type, Optional, Any, Union
+from typing import (
+    Protocol,
+    ClassVar,
+    Tuple,
+    Dict,
+    Type,
+    Optional,
+    Any,
+    Union,
+    Iterator,
+    Iterable,
+)
 
 from lxml import objectify, etree
 
-from materialsdb import classes
+from materialsdb import classes, schemas
 
 
 def get_xml_schema() -> str:
-    return str(Path(__file__).parent / "schema/materialsdb103.xsd")
+    return str(schemas.get_schema_path("103"))
 
 
 def get_element_name(element: objectify.ObjectifiedElement) -> str:
@@ -27,15 +42,16 @@ def get_element_name(element: objectify.ObjectifiedElement) -> str:
     return m.group(1) if m else element.tag
 
 
+NAMESPACE = "http://www.materialsdb.org"
+NSMAP = {
+    None: NAMESPACE,
+    "xsi": "http://www.w3.org/2001/XMLSchema-instance",
+    "SchemaLocation": "http://www.materialsdb.org/schemas/materialsdb103.xsd",
+}
+
+
 def create_element_maker():
-    nsmap = {
-        None: "http://www.materialsdb.org",
-        "xsi": "http://www.w3.org/2001/XMLSchema-instance",
-        "SchemaLocation": "http://www.materialsdb.org/schemas/materialsdb103.xsd",
-    }
-    return objectify.ElementMaker(
-        namespace="http://www.materialsdb.org", nsmap=nsmap, annotate=False
-    )
+    return objectify.ElementMaker(namespace=NAMESPACE, nsmap=NSMAP, annotate=False)
 
 
 def get_valid_root(tree: objectify.ObjectifiedElement) -> str:
@@ -50,62 +66,319 @@ def get_valid_root(tree: objectify.ObjectifiedElement) -> str:
     return root
 
 
-class XmlDeserialiser:
-    def __init__(self):
-        self.schema = etree.XMLSchema(file=get_xml_schema())
-        self.parser = objectify.makeparser(schema=self.schema)
+def is_optional(type_hint) -> bool:
+    return typing.get_origin(type_hint) is typing.Union and typing.get_args(type_hint)[
+        1
+    ] is type(None)
 
-    def from_xml(self, xml_path: str, assert_schema: bool = False) -> classes.Materials:
-        if assert_schema:
-            tree = objectify.parse(xml_path, self.parser)
-        else:
-            tree = objectify.parse(xml_path)
-        return self.from_element(get_valid_root(tree))
 
-    def from_element(self, element=None, base_class=None):
-        element_name = get_element_name(element)
-        element_class = base_class or getattr(classes, self.cls_name(element_name))
-        kwargs: Dict[str, Any] = {}
-        if element_class.xs_type != "element":
-            kwargs["object"] = element.text or ""
-        type_hints = typing.get_type_hints(element_class)
-        for attrib in getattr(element_class, "xml_attributes", ()):
-            value = element.get(attrib)
-            if value is None:
-                continue
-            base_class = self.strip_optional(type_hints[attrib])
+def strip_optional(type_hint):
+    if is_optional(type_hint):
+        return typing.get_args(type_hint)[0]
+    return type_hint
+
+
+def is_simple_type(value_class: Type) -> bool:
+    return getattr(value_class, "xs_type", None) == "simpleType"
+
+
+class Interner:
+    """Converter returning one shared instance per enumerated value so codes repeated
+    across materials (lang, country, group…) are stored once and compare by identity.
+    Values outside of the enumeration are converted as is so interned values are
+    bounded by the schema."""
+
+    def __init__(self, value_class: Type):
+        self.value_class = value_class
+        self.enum = frozenset(value_class.xml_enum)
+        self.values: Dict[str, Any] = {}
 
-            kwargs[attrib] = base_class(value)
+    def __call__(self, value: str) -> Any:
+        instance = self.values.get(value)
+        if instance is None:
+            instance = self.value_class(value)
+            if value in self.enum:
+                instance = self.values.setdefault(value, instance)
+        return instance
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+@functools.lru_cache(maxsize=None)
+def get_interner(value_class: Type) -> Interner:
+    return Interner(value_class)
+
+
+def get_converter(value_class: Type):
+    """Enumerated simpleType values (codes) are interned. Other values like ids and
+    dates are mostly unique and are converted as is."""
+    if is_simple_type(value_class) and getattr(value_class, "xml_enum", None):
+        return get_interner(value_class)
+    return value_class
+
+
+class DecodePlan:
+    """Decoder for one classes.* type. Type hints are resolved once into attribute
+    converters and child decoders then reused for every element of this type."""
+
+    def __init__(self, element_class: Type):
+        type_hints = typing.get_type_hints(element_class)
+        self.element_class = element_class
+        self.has_text = element_class.xs_type != "element"
+        self.attributes: Tuple[Tuple[str, Type], ...] = tuple(
+            (attrib, get_converter(strip_optional(type_hints[attrib])))
+            for attrib in getattr(element_class, "xml_attributes", ())
+        )
+        # child name: (is_list, child class)
+        self.children: Dict[str, Tuple[bool, Type]] = {}
         for child_name in getattr(element_class, "xml_elements", ()):
-            type_hint = type_hints[child_name]
-            base_class = self.strip_optional(type_hint)
+            base_class = strip_optional(type_hints[child_name])
             if typing.get_origin(base_class) is list:
-                value = []
-                inner_type = typing.get_args(base_class)[0]
-                for child in getattr(element, child_name, ()):
-                    try:
-                        value.append(self.from_element(child, inner_type))
-                    except TypeError as err:
-                        print(
-                            f"{Path(child.base).name}: Element '{child_name}' line {child.sourceline} seems invalid:\n\t{err}"
-                        )
-                kwargs[child_name] = value
+                self.children[child_name] = (True, typing.get_args(base_class)[0])
             else:
-                child = getattr(element, child_name, None)
-                if child is not None:
-                    kwargs[child_name] = self.from_element(child, base_class)
+                self.children[child_name] = (False, base_class)
+        self.list_names = tuple(
+            name for name, (is_list, _) in self.children.items() if is_list
+        )
+        # Namespaced tag: child name. Filled as tags are encountered.
+        self.tags: Dict[str, str] = {}
+
+    def child_name(self, tag: str) -> str:
+        name = self.tags.get(tag)
+        if name is None:
+            name = self.tags[tag] = tag.rpartition("}")[2]
+        return name
+
+    def decode_attributes(self, element) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {}
+        get = element.get
+        for attrib, converter in self.attributes:
+            value = get(attrib)
+            if value is not None:
+                kwargs[attrib] = converter(value)
+        return kwargs
+
+    def decode_child(self, element, child_name: str) -> Any:
+        """Decode only child_name children of element"""
+        is_list, child_class = self.children[child_name]
+        plan = get_plan(child_class)
+        values = [
+            plan.decode(child) for child in element.iterchildren(f"{{*}}{child_name}")
+        ]
+        if is_list:
+            return values
+        return values[0] if values else None
+
+    def decode(self, element) -> Any:
+        kwargs = self.decode_attributes(element)
+        for name in self.list_names:
+            kwargs[name] = []
+        if self.has_text:
+            kwargs["object"] = element.text or ""
+        children = self.children
+        for child in element.iterchildren():
+            tag = child.tag
+            if not isinstance(tag, str):
+                continue  # comments and processing instructions
+            child_name = self.child_name(tag)
+            child_def = children.get(child_name)
+            if child_def is None:
+                continue
+            is_list, child_class = child_def
+            if not is_list:
+                if child_name not in kwargs:
+                    kwargs[child_name] = get_plan(child_class).decode(child)
+                continue
+            try:
+                kwargs[child_name].append(get_plan(child_class).decode(child))
+            except TypeError as err:
+                print(
+                    f"{Path(child.base).name}: Element '{child_name}' line {child.sourceline} seems invalid:\n\t{err}"
+                )
+        return self.element_class(**kwargs)
 
-        return element_class(**kwargs)
+
+@functools.lru_cache(maxsize=None)
+def get_plan(element_class: Type) -> DecodePlan:
+    return DecodePlan(element_class)
+
+
+class LazyElement:
+    """Mixin for a classes.* element keeping a reference to its lxml element.
+    Attributes are decoded immediately. Child elements are decoded the first time they
+    are accessed, single element children being lazy themselves. Pickling or copying
+    returns a plain instance of element_class."""
+
+    __slots__ = ()
+    element_class: ClassVar[Type]
+    defaults: ClassVar[Dict[str, Any]]
+
+    def __init__(self, element):
+        self._element = element
+        values = dict(self.defaults)
+        values.update(get_plan(self.element_class).decode_attributes(element))
+        for attrib, value in values.items():
+            setattr(self, attrib, value)
+
+    def __getattr__(self, name: str) -> Any:
+        plan = get_plan(self.element_class)
+        child_def = plan.children.get(name)
+        if child_def is None:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+        is_list, child_class = child_def
+        if is_list or child_class.xs_type != "element":
+            value = plan.decode_child(self._element, name)
+        else:
+            child = next(self._element.iterchildren(f"{{*}}{name}"), None)
+            value = None if child is None else get_lazy_class(child_class)(child)
+        setattr(self, name, value)
+        return value
+
+    def field_values(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, field.name) for field in dataclasses.fields(self))
+
+    def __eq__(self, other):
+        if isinstance(other, self.element_class):
+            return self.field_values() == tuple(
+                getattr(other, field.name) for field in dataclasses.fields(other)
+            )
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return self.element_class, self.field_values()
+
+
+@functools.lru_cache(maxsize=None)
+def get_lazy_class(element_class: Type) -> Type:
+    """Return Lazy<element_class> class deriving from LazyElement and element_class"""
+    defaults = {
+        field.name: field.default
+        for field in dataclasses.fields(element_class)
+        if field.default is not dataclasses.MISSING
+        and field.name in element_class.xml_attributes
+    }
+    name = f"Lazy{element_class.__name__}"
+    namespace = {
+        "__slots__": ("_element",),
+        "__module__": __name__,
+        "__qualname__": name,
+        "element_class": element_class,
+        "defaults": defaults,
+    }
+    return type(name, (LazyElement, element_class), namespace)
+
+
+LazyMaterial = get_lazy_class(classes.Material)
+
+
+Header = namedtuple("Header", classes.Materials.xml_attributes)
+
+
+class XmlDeserialiser:
+    def __init__(self, validate_in_background: bool = False):
+        """validate_in_background: validate every file read by from_xml in a
+        background thread. Results are available in self.validations by path."""
+        self.schema = schemas.get_schema("103")
+        self.validate_in_background = validate_in_background
+        self.validations: Dict[str, "Future[schemas.ValidationResult]"] = {}
+
+    def from_xml(
+        self, xml_path: str, assert_schema: bool = False, lazy: bool = False
+    ) -> classes.Materials:
+        """assert_schema: raise etree.DocumentInvalid if document is not valid against
+        the schema version it declares
+        lazy: materials are LazyMaterial decoding their content on first access. Fast
+        to browse or filter materials by names or group.
+        Raise ValueError if a required attribute or element is missing."""
+        if self.validate_in_background and not assert_schema:
+            self.validations[str(xml_path)] = schemas.validate_in_background(xml_path)
+        tree = objectify.parse(str(xml_path))
+        if assert_schema:
+            schemas.assert_valid(tree)
+        try:
+            if lazy:
+                return self.lazy_from_element(get_valid_root(tree))
+            return self.from_element(get_valid_root(tree))
+        except TypeError as err:  # A required attribute or element is missing
+            raise ValueError(
+                f"{Path(xml_path).name}: invalid materials: {err}"
+            ) from err
+
+    def lazy_from_element(self, element) -> classes.Materials:
+        """Decode materials root with LazyMaterial in place of materials"""
+        plan = get_plan(classes.Materials)
+        kwargs = plan.decode_attributes(element)
+        kwargs["material"] = [
+            LazyMaterial(child) for child in element.iterchildren("{*}material")
+        ]
+        for name in ("sig", "publickey"):
+            kwargs[name] = plan.decode_child(element, name)
+        return classes.Materials(**kwargs)
+
+    def read_header(self, xml_path: str) -> Header:
+        """Read materials root attributes without parsing materials"""
+        plan = get_plan(classes.Materials)
+        for _, root in etree.iterparse(str(xml_path), events=("start",)):
+            values = dict.fromkeys(Header._fields)
+            values.update(plan.decode_attributes(root))
+            return Header(**values)
+        raise ValueError(f"{xml_path}: document has no root element")
+
+    def iter_materials(
+        self, xml_path: str, source: Optional[classes.Materials] = None
+    ) -> Iterator[classes.Material]:
+        """Yield materials one at a time. Each material element is cleared once
+        decoded so memory does not grow with document size. If source is given its
+        sig and publickey are set when they are reached at the end of document."""
+        plan = get_plan(classes.Material)
+        for _, element in etree.iterparse(
+            str(xml_path),
+            events=("end",),
+            tag=("{*}material", "{*}sig", "{*}publickey"),
+        ):
+            element_name = get_element_name(element)
+            if element_name != "material":
+                if source is not None:
+                    setattr(
+                        source, element_name, get_plan(classes.THexHash).decode(element)
+                    )
+                continue
+            try:
+                yield plan.decode(element)
+            except TypeError as err:
+                print(
+                    f"{Path(xml_path).name}: Element 'material' line {element.sourceline} seems invalid:\n\t{err}"
+                )
+            element.clear()
+            # Drop references to previous siblings kept by the root element
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    def stream(self, xml_path: str) -> classes.Materials:
+        """Return materials header with a single pass iterator of materials instead
+        of a list. sig and publickey are None until materials are exhausted."""
+        header = self.read_header(xml_path)
+        source = classes.Materials(
+            material=[], sig=None, publickey=None, **header._asdict()
+        )
+        source.material = self.iter_materials(xml_path, source)
+        return source
+
+    def from_element(self, element=None, base_class=None):
+        element_name = get_element_name(element)
+        element_class = base_class or getattr(classes, self.cls_name(element_name))
+        return get_plan(element_class).decode(element)
 
     def strip_optional(self, type_hint):
-        if self.is_optional(type_hint):
-            return typing.get_args(type_hint)[0]
-        return type_hint
+        return strip_optional(type_hint)
 
     def is_optional(self, type_hint):
-        return typing.get_origin(type_hint) is typing.Union and typing.get_args(
-            type_hint
-        )[1] is type(None)
+        return is_optional(type_hint)
 
     def cls_name(self, name: str) -> str:
         return name if name[0].isupper() else name.title()
@@ -113,8 +386,7 @@ class XmlDeserialiser:
 
 class XmlSerialiser:
     def __init__(self):
-        self.schema = etree.XMLSchema(file=get_xml_schema())
-        self.parser = objectify.makeparser(schema=self.schema)
+        self.schema = schemas.get_schema("103")
         self.oem = create_element_maker()
 
     def to_xml(self, source: classes.Materials, xml_path: str) -> None:
@@ -130,6 +402,42 @@ class XmlSerialiser:
         with open(xml_path, "wb") as file:
             file.write(xml_str)
 
+    def to_xml_stream(
+        self,
+        source: classes.Materials,
+        xml_path: str,
+        materials: Optional[Iterable[classes.Material]] = None,
+    ) -> None:
+        """Write each material as soon as it is produced instead of building the
+        whole document first. Header is taken from source and materials default to
+        source.material which can be an iterator (e.g. XmlDeserialiser.stream) so
+        merging several producers never requires the whole document in memory:
+        to_xml_stream(header_source, path, itertools.chain(*material_iterators))"""
+        attributes = {}
+        for attrib in source.xml_attributes:
+            value = getattr(source, attrib, None)
+            if value is not None:
+                attributes[attrib] = str(value)
+        materials = source.material if materials is None else materials
+        with etree.xmlfile(str(xml_path), encoding="UTF-8") as xml_file:
+            xml_file.write_declaration(standalone=False)
+            with xml_file.element(
+                f"{{{NAMESPACE}}}{source.xml_name}", attributes, nsmap=NSMAP
+            ):
+                xml_file.write("\n")
+                for material in materials:
+                    self.write_element(xml_file, material, "material")
+                for name in ("sig", "publickey"):
+                    element = getattr(source, name, None)
+                    if element is not None:
+                        self.write_element(xml_file, element, name)
+
+    def write_element(self, xml_file, element, name: str) -> None:
+        xml_element = self.serialise(element, name)
+        objectify.deannotate(xml_element, xsi_nil=True)
+        etree.cleanup_namespaces(xml_element)
+        xml_file.write(xml_element, pretty_print=True)
+
     def serialise(self, element, name: str = None):
         # Process base element with attribute and text value
         kwargs = {}
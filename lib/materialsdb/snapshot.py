@@ -0,0 +1,127 @@
+# coding: UTF-8
+"""This module caches deserialised materials as binary snapshots.
+
+A snapshot is a pickled classes.Materials preceded by a header which identifies its
+source xml (path, size, modification time, SHA-256) and the version of classes and
+deserialiser used. Loading a fresh snapshot does not need any xml parsing.
+"""
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import pickle
+import struct
+from typing import Any, Dict, Optional
+
+from materialsdb import cache, classes, serialiser
+
+SNAPSHOT_VERSION = 1
+MAGIC = b"MDBSNAP\x00"
+HEADER_SIZE = struct.Struct("<I")
+
+
+def get_snapshots_dir() -> pathlib.Path:
+    snapshots_dir = cache.get_cache_folder() / "Snapshots"
+    snapshots_dir.mkdir(parents=True, exist_ok=True)
+    return snapshots_dir
+
+
+@functools.lru_cache(maxsize=None)
+def get_classes_stamp() -> str:
+    """Snapshots are invalidated when snapshot format, generated classes or the
+    deserialiser which decodes them change"""
+    sha256 = hashlib.sha256()
+    for module in (classes, serialiser):
+        sha256.update(pathlib.Path(module.__file__).read_bytes())
+    return f"{SNAPSHOT_VERSION}-{sha256.hexdigest()}"
+
+
+def get_snapshot_path(xml_path) -> pathlib.Path:
+    xml_path = pathlib.Path(xml_path).resolve()
+    path_hash = hashlib.sha1(str(xml_path).encode("utf-8")).hexdigest()[:12]
+    return get_snapshots_dir() / f"{xml_path.stem}_{path_hash}.snapshot"
+
+
+def get_source_key(xml_path, with_hash: bool = True) -> Dict[str, Any]:
+    xml_path = pathlib.Path(xml_path).resolve()
+    stat = xml_path.stat()
+    key = {"path": str(xml_path), "size": stat.st_size, "mtime": stat.st_mtime}
+    if with_hash:
+        key["sha256"] = cache.file_sha256(xml_path).hexdigest()
+    return key
+
+
+def read_header(snapshot_path: pathlib.Path) -> Optional[Dict[str, Any]]:
+    with snapshot_path.open("rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            return None
+        (size,) = HEADER_SIZE.unpack(file.read(HEADER_SIZE.size))
+        return json.loads(file.read(size).decode("utf-8"))
+
+
+def is_fresh(header: Optional[Dict[str, Any]], xml_path) -> bool:
+    """Source hash is only computed if modification time changed. Header source then
+    gets the new modification time."""
+    if not header or header.get("stamp") != get_classes_stamp():
+        return False
+    xml_path = pathlib.Path(xml_path).resolve()
+    source = header.get("source", {})
+    if source.get("path") != str(xml_path):
+        return False
+    return cache.is_unchanged(source, xml_path)
+
+
+def read(xml_path) -> Optional[classes.Materials]:
+    """Return materials from xml_path snapshot or None if there is no fresh snapshot"""
+    snapshot_path = get_snapshot_path(xml_path)
+    if not snapshot_path.exists():
+        return None
+    try:
+        header = read_header(snapshot_path)
+        mtime = header.get("source", {}).get("mtime") if header else None
+        if not is_fresh(header, xml_path):
+            return None
+        with snapshot_path.open("rb") as file:
+            file.seek(len(MAGIC))
+            (size,) = HEADER_SIZE.unpack(file.read(HEADER_SIZE.size))
+            file.seek(size, os.SEEK_CUR)
+            materials = pickle.load(file)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError) as err:
+        print(f"{snapshot_path.name}: snapshot is unreadable and is ignored: {err}")
+        return None
+    if header["source"]["mtime"] != mtime:
+        # Source has been touched but not modified. Recording its new modification
+        # time avoids hashing it again on every load.
+        write(xml_path, materials, header["source"])
+    return materials
+
+
+def write(
+    xml_path, materials: classes.Materials, source: Optional[Dict[str, Any]] = None
+) -> pathlib.Path:
+    """source is get_source_key of xml_path if already known"""
+    snapshot_path = get_snapshot_path(xml_path)
+    header = json.dumps(
+        {"stamp": get_classes_stamp(), "source": source or get_source_key(xml_path)}
+    ).encode("utf-8")
+    with cache.replacing(snapshot_path) as temp_path, temp_path.open("wb") as file:
+        file.write(MAGIC)
+        file.write(HEADER_SIZE.pack(len(header)))
+        file.write(header)
+        pickle.dump(materials, file, protocol=pickle.HIGHEST_PROTOCOL)
+    return snapshot_path
+
+
+def load(
+    xml_path, deserialiser: Optional[serialiser.XmlDeserialiser] = None
+) -> classes.Materials:
+    """Return materials from a fresh snapshot. If there is none xml_path is
+    deserialised and a new snapshot is written"""
+    materials = read(xml_path)
+    if materials is not None:
+        return materials
+    deserialiser = deserialiser or serialiser.XmlDeserialiser()
+    materials = deserialiser.from_xml(str(xml_path))
+    write(xml_path, materials)
+    return materials
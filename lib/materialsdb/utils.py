@@ -1,5 +1,6 @@
+import bisect
 import datetime
-from typing import Generator
+from typing import Dict, Generator, Iterable, List, Optional, Tuple
 from materialsdb.classes import (
     TDateTime,
     TLocalizedString,
@@ -30,31 +31,97 @@ def new_tdatetime():
     return TDateTime(date_to_xml(datetime.datetime.now(datetime.timezone.utc)))
 
 
+def is_available(
+    material: Material, country: str, date: Optional[float] = None
+) -> bool:
+    """Material is available if it is not restricted to any country or if it is sold in
+    country at date (default: now) in materialsdb xml days"""
+    material_countries = getattr(
+        getattr(material.information, "countries", ()), "country", ()
+    )
+    if not material_countries:
+        return True
+    if date is None:
+        date = date_to_xml(datetime.datetime.now(tz=datetime.timezone.utc))
+    for material_country in material_countries:
+        if material_country.name != country:
+            continue
+        selling_until = getattr(material_country, "sellinguntil", None) or 10 ** 66
+        if material_country.sellingfrom < date < selling_until:
+            return True
+    return False
+
+
 def get_materials(
     materials: Materials, country: str, include_outdated=False
 ) -> Generator[Material, None, None]:
+    if include_outdated:
+        yield from materials.material
+        return
+    current_datetime = date_to_xml(datetime.datetime.now(tz=datetime.timezone.utc))
     for material in materials.material:
-        if include_outdated:
-            yield material
-            continue
-        material_countries = getattr(
-            getattr(material.information, "countries", ()), "country", ()
-        )
-        if not material_countries:
-            yield material
-            continue
-        for material_country in material_countries:
-            if not material_country == country:
-                break
-        else:
-            continue
-        current_datetime = date_to_xml(datetime.datetime.now(tz=datetime.timezone.utc))
-        selling_from = material_country.sellingfrom
-        selling_until = getattr(material_country, "sellinguntil", None) or 10 ** 66
-        if selling_from < current_datetime and selling_until > current_datetime:
+        if is_available(material, country, current_datetime):
             yield material
 
 
+class AvailabilityIndex:
+    """Selling intervals of materials per country, sorted by start, so materials
+    available in a country at a date are found without walking every material"""
+
+    def __init__(self, materials: Iterable[Material]):
+        self.materials: List[Material] = list(materials)
+        # Indices of materials which are not restricted to any country
+        self.unrestricted: List[int] = []
+        intervals: Dict[str, List[Tuple[float, float, int]]] = {}
+        for index, material in enumerate(self.materials):
+            material_countries = getattr(
+                getattr(material.information, "countries", ()), "country", ()
+            )
+            if not material_countries:
+                self.unrestricted.append(index)
+                continue
+            for material_country in material_countries:
+                selling_until = (
+                    getattr(material_country, "sellinguntil", None) or 10 ** 66
+                )
+                intervals.setdefault(material_country.name, []).append(
+                    (material_country.sellingfrom, selling_until, index)
+                )
+        # country: (sorted starts, ends, material indices)
+        self.countries: Dict[str, Tuple[List[float], List[float], List[int]]] = {}
+        for country, country_intervals in intervals.items():
+            country_intervals.sort()
+            starts, ends, indices = zip(*country_intervals)
+            self.countries[country] = (list(starts), list(ends), list(indices))
+
+    @classmethod
+    def from_sources(cls, sources: Iterable[Materials]) -> "AvailabilityIndex":
+        return cls(material for source in sources for material in source.material)
+
+    def available_indices(
+        self, country: str, date: Optional[float] = None
+    ) -> List[int]:
+        if date is None:
+            date = date_to_xml(datetime.datetime.now(tz=datetime.timezone.utc))
+        indices = set(self.unrestricted)
+        intervals = self.countries.get(country)
+        if intervals:
+            starts, ends, materials = intervals
+            # Only intervals starting strictly before date can contain it
+            stop = bisect.bisect_left(starts, date)
+            indices.update(
+                index for end, index in zip(ends[:stop], materials[:stop]) if date < end
+            )
+        return sorted(indices)
+
+    def available(self, country: str, date: Optional[float] = None) -> List[Material]:
+        """Materials available in country at date (default: now) in materialsdb xml
+        days, in their original order. Same result as get_materials."""
+        return [
+            self.materials[index] for index in self.available_indices(country, date)
+        ]
+
+
 def get_material_name(material: Material, lang: str) -> TLocalizedString:
     name = TLocalizedString("")
     for name in material.information.names.name:
@@ -73,7 +140,7 @@ def get_material_description(material: Material, lang: str) -> TLocalizedString:
 
 
 def get_material_webinfo(material: Material, lang: str) -> Webinfo:
-    webinfo = Webinfo(Mimetype(""), "", "", lang=ISO639_1(lang))
+    webinfo = Webinfo(href="", mime=Mimetype(""), lang=ISO639_1(lang))
     webinfos = getattr(material.information, "webinfos", None)
     for webinfo in getattr(webinfos, "webinfo", ()):
         if webinfo.lang == lang:
@@ -39,7 +39,7 @@ except ImportError:  # Revit ⩾ 2022
     from Autodesk.Revit.DB import UnitTypeId
 from Autodesk.Revit import Exceptions
 
-from materialsdb import cache, utils, config
+from materialsdb import cache, utils, config, snapshot
 from materialsdb.serialiser import XmlDeserialiser
 
 COLOR_PROP_NAMES = (
@@ -342,15 +342,19 @@ def main():
     output_folder = get_output_folder()
     save_as_options = create_save_as_options()
     material_creator = MaterialCreator(lang, country)
-    existing, updated, deleted = cache.update_producers_data()
-    delete_for_all_versions(deleted + updated)
+    report = cache.update_producers_data()
+    for producer in report.failed:
+        print(f"{producer.name} could not be downloaded, it will be retried next time")
+    existing = list(report.existing)
+    updated = list(report.updated)
+    delete_for_all_versions(list(report.deleted) + updated)
     for producer in cache.producers():
         if producer not in existing + updated:
             existing.append(producer)
     updated.extend(check_existing(existing, output_folder))
     for producer in updated:
         print(f"Creating {producer.stem}")
-        source = deserialiser.from_xml(str(producer))
+        source = snapshot.load(producer, deserialiser)
         doc = __revit__.Application.NewProjectDocument(UnitSystem.Metric)
         with CustomTransaction("Create materials", doc):
             material_creator.create_materials(doc, source)
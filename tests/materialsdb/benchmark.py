@@ -0,0 +1,714 @@
+# coding: UTF-8
+"""Benchmarks for materialsdb on synthetic data.
+
+Run with: python tests/materialsdb/benchmark.py
+"""
+import os
+import pathlib
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lxml import etree, objectify
+
+# Appended so installed packages take precedence over the Windows builds of lib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "lib"))
+
+from materialsdb import (  # noqa: E402
+    bulk,
+    cache,
+    catalogue,
+    classes,
+    diff,
+    offsets,
+    search,
+    snapshot,
+    utils,
+)
+from materialsdb.serialiser import (  # noqa: E402
+    XmlDeserialiser,
+    get_valid_root,
+    strip_optional,
+)
+from synthetic import (  # noqa: E402
+    COUNTRIES,
+    serve,
+    synthetic_index,
+    synthetic_producer,
+    temporary_cache,
+)
+
+
+def timeit(function: Callable, *args, **kwargs) -> Tuple[float, object]:
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_downloads(
+    producers: int = 100, latency: float = 0.05, workers: Tuple[int, ...] = (1, 8)
+) -> List[Tuple[int, float]]:
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        server_dir = pathlib.Path(folder)
+        for number in range(producers):
+            synthetic_producer(
+                server_dir / f"producer_{number}.xml", materials=20, seed=number
+            )
+        with serve(server_dir, latency) as base_url:
+            index_path = server_dir / "ProducerIndex.xml"
+            etree.ElementTree(synthetic_index(producers, base_url)).write(
+                str(index_path)
+            )
+            for worker_count in workers:
+                with temporary_cache():
+                    duration, report = timeit(
+                        cache.update_producers_from_index,
+                        f"{base_url}/ProducerIndex.xml",
+                        workers=worker_count,
+                    )
+                assert len(report.updated) == producers
+                print(
+                    f"downloads: {producers} producers, {worker_count} workers: {duration:.2f}s"
+                )
+                results.append((worker_count, duration))
+    return results
+
+
+def bench_revalidation(producers: int = 100, latency: float = 0.05) -> float:
+    """Time a refresh of an up to date cache"""
+    with tempfile.TemporaryDirectory() as folder:
+        server_dir = pathlib.Path(folder)
+        for number in range(producers):
+            synthetic_producer(
+                server_dir / f"producer_{number}.xml", materials=20, seed=number
+            )
+        with serve(server_dir, latency) as base_url, temporary_cache():
+            index_url = f"{base_url}/ProducerIndex.xml"
+            etree.ElementTree(synthetic_index(producers, base_url)).write(
+                str(server_dir / "ProducerIndex.xml")
+            )
+            cache.update_producers_from_index(index_url)
+            duration, report = timeit(cache.update_producers_from_index, index_url)
+    assert len(report.existing) == producers and not report.updated
+    print(f"revalidation: {producers} producers up to date: {duration:.3f}s")
+    return duration
+
+
+def bench_index_diff(
+    sizes: Tuple[int, ...] = (1000, 5000, 10000, 50000), quadratic_limit: int = 5000
+) -> List[Tuple[int, float]]:
+    """Compare cache.diff_index with a get_by_id lookup per company"""
+    results = []
+    for size in sizes:
+        cached_root = synthetic_index(size)
+        new_root = synthetic_index(size)
+        for company in new_root[::10]:
+            company.set("KnownVersion", "2")
+        duration, diff = timeit(cache.diff_index, cached_root, new_root)
+        assert len(diff.changed) == len(new_root[::10])
+        line = f"index diff: {size} companies: {duration * 1000:.1f}ms"
+        if size <= quadratic_limit:
+            lookup_duration, _ = timeit(
+                lambda: [
+                    cache.get_by_id(cached_root, company.get("id"))
+                    for company in new_root
+                ]
+            )
+            line += f" (get_by_id: {lookup_duration * 1000:.1f}ms)"
+        print(line)
+        results.append((size, duration))
+    return results
+
+
+def bench_snapshot(materials: int = 2000) -> Tuple[float, float]:
+    """Compare a full deserialisation with a warm snapshot load"""
+    with tempfile.TemporaryDirectory() as folder, temporary_cache():
+        xml_path = synthetic_producer(pathlib.Path(folder) / "producer.xml", materials)
+        parse_duration, source = timeit(XmlDeserialiser().from_xml, str(xml_path))
+        snapshot.write(xml_path, source)
+        load_duration, loaded = timeit(snapshot.load, xml_path)
+    assert loaded == source
+    print(
+        f"snapshot: {materials} materials: parse {parse_duration:.2f}s, warm load {load_duration:.3f}s"
+    )
+    return parse_duration, load_duration
+
+
+def bench_offsets(
+    producers: int = 20, materials: int = 500, lookups: int = 100
+) -> Tuple[float, float, float]:
+    """Compare a single material lookup through byte offsets index with a full parse
+    of its producer"""
+    with temporary_cache():
+        paths = [
+            synthetic_producer(
+                cache.get_producers_dir() / f"producer_{number}.xml", materials, number
+            )
+            for number in range(producers)
+        ]
+        index = offsets.OffsetIndex()
+        build_duration, _ = timeit(index.refresh)
+        ids = [entry.id for entry in index.entries()]
+        targets = random.Random(0).sample(ids, lookups)
+        load_duration, index = timeit(offsets.OffsetIndex)
+        start = time.perf_counter()
+        for id in targets:
+            material = index.get_material(id)
+            assert material.id == id
+        lookup_duration = (time.perf_counter() - start) / lookups
+        parse_duration, source = timeit(XmlDeserialiser().from_xml, str(paths[-1]))
+        entry = index.lookup(source.material[-1].id)
+        assert index.load(entry) == source.material[-1]
+    print(
+        f"offsets: {producers * materials} materials: index {build_duration:.2f}s, index load {load_duration:.2f}s, lookup {lookup_duration * 1000:.1f}ms, full parse {parse_duration:.2f}s"
+    )
+    return build_duration, lookup_duration, parse_duration
+
+
+def is_insulation_for(material: classes.Material, country: str) -> bool:
+    """Brute force equivalent of catalogue query used as a reference"""
+    information = material.information
+    if information.group != "Insulation":
+        return False
+    countries = [c.name for c in getattr(information.countries, "country", ())]
+    if countries and country not in countries:
+        return False
+    for layer in getattr(material.layers, "layer", ()):
+        value = utils.get_by_country(layer.thermal or (), country)
+        if value and value.lambda_value is not None:
+            if 0.02 <= value.lambda_value <= 0.05:
+                return True
+    return False
+
+
+def bench_catalogue(
+    producers: int = 20, materials: int = 500
+) -> Tuple[float, float, float, float]:
+    """Compare a catalogue query with deserialising and filtering every producer"""
+    with temporary_cache():
+        paths = [
+            synthetic_producer(
+                cache.get_producers_dir() / f"producer_{number}.xml", materials, number
+            )
+            for number in range(producers)
+        ]
+        with catalogue.Catalogue() as database:
+            build_duration, _ = timeit(database.sync)
+            synthetic_producer(paths[0], materials, producers)
+            report = cache.Report(paths[1:], paths[:1], [])
+            update_duration, imported = timeit(database.update, report)
+            assert imported == paths[:1]
+            query_duration, result = timeit(
+                database.query,
+                group="Insulation",
+                country="CH",
+                lambda_value=(0.02, 0.05),
+            )
+        deserialiser = XmlDeserialiser()
+        scan_duration, expected = timeit(
+            lambda: [
+                material.id
+                for path in sorted(paths)
+                for material in deserialiser.from_xml(str(path)).material
+                if is_insulation_for(material, "CH")
+            ]
+        )
+    assert sorted(row.id for row in result) == sorted(expected)
+    print(
+        f"catalogue: {producers * materials} materials: build {build_duration:.2f}s, update one producer {update_duration:.2f}s, query {query_duration * 1000:.1f}ms, deserialise and filter {scan_duration:.2f}s"
+    )
+    return build_duration, update_duration, query_duration, scan_duration
+
+
+def bench_search(
+    producers: int = 20, materials: int = 500, queries: Tuple[str, ...] = ()
+) -> Tuple[float, float, float]:
+    """Build search index then time first (lazy merge) and warm fuzzy queries"""
+    queries = queries or ("Materail 96283", "matrial", "description in de")
+    with temporary_cache():
+        for number in range(producers):
+            synthetic_producer(
+                cache.get_producers_dir() / f"producer_{number}.xml", materials, number
+            )
+        build_duration, _ = timeit(search.SearchIndex().refresh)
+        index = search.SearchIndex()
+        first_duration, _ = timeit(index.search, queries[0])
+        start = time.perf_counter()
+        for query in queries:
+            assert index.search(query)
+        warm_duration = (time.perf_counter() - start) / len(queries)
+    print(
+        f"search: {producers * materials} materials: index {build_duration:.2f}s, first query {first_duration * 1000:.1f}ms, warm query {warm_duration * 1000:.1f}ms"
+    )
+    return build_duration, first_duration, warm_duration
+
+
+def bench_availability(
+    producers: int = 10, materials: int = 500, dates: int = 10
+) -> Tuple[float, float, float]:
+    """Filter every producer for every country at several dates with
+    utils.is_available and with a prebuilt utils.AvailabilityIndex"""
+    with tempfile.TemporaryDirectory() as folder:
+        deserialiser = XmlDeserialiser()
+        sources = [
+            deserialiser.from_xml(
+                str(
+                    synthetic_producer(
+                        pathlib.Path(folder) / f"producer_{number}.xml",
+                        materials,
+                        number,
+                    )
+                )
+            )
+            for number in range(producers)
+        ]
+    all_materials = [material for source in sources for material in source.material]
+    rng = random.Random(0)
+    queries = [
+        (country, rng.uniform(36000, 46000))
+        for country in COUNTRIES + ("IT",)
+        for _ in range(dates)
+    ]
+    start = time.perf_counter()
+    expected = [
+        [m for m in all_materials if utils.is_available(m, country, date)]
+        for country, date in queries
+    ]
+    filter_duration = time.perf_counter() - start
+    build_duration, index = timeit(utils.AvailabilityIndex.from_sources, sources)
+    start = time.perf_counter()
+    result = [index.available(country, date) for country, date in queries]
+    index_duration = time.perf_counter() - start
+    assert result == expected
+    print(
+        f"availability: {len(all_materials)} materials, {len(queries)} queries: filter {filter_duration:.2f}s, index build {build_duration:.3f}s, index queries {index_duration:.3f}s"
+    )
+    return filter_duration, build_duration, index_duration
+
+
+def bench_diff(materials: int = 5000, changes: int = 50) -> Tuple[float, int]:
+    """Diff two versions of a synthetic producer: changes materials modified, removed
+    and added each. Check that exactly those are reported."""
+    with tempfile.TemporaryDirectory() as folder:
+        old_path = synthetic_producer(pathlib.Path(folder) / "old.xml", materials)
+        added_path = synthetic_producer(pathlib.Path(folder) / "added.xml", changes, 1)
+        deserialiser = XmlDeserialiser()
+        old = deserialiser.from_xml(str(old_path))
+        new = deserialiser.from_xml(str(old_path))
+        added = deserialiser.from_xml(str(added_path)).material
+    rng = random.Random(0)
+    picked = rng.sample(range(materials), 2 * changes)
+    modified = {new.material[index].id for index in picked[:changes]}
+    removed = {new.material[index].id for index in picked[changes:]}
+    for material in new.material:
+        if material.id in modified:
+            layer = material.layers.layer[0]
+            layer.thermal[0].lambda_value = (layer.thermal[0].lambda_value or 0) + 0.01
+    new.material = [
+        material for material in new.material if material.id not in removed
+    ] + added
+    new.ver += 1
+    duration, result = timeit(diff.diff_materials, old, new)
+    assert {material_diff.new.id for material_diff in result.modified} == modified
+    assert {material.id for material in result.removed} == removed
+    assert [material.id for material in result.added] == [m.id for m in added]
+    assert all(
+        len(material_diff.changes) == 1
+        and material_diff.changes[0].path[-1] == "lambda_value"
+        for material_diff in result.modified
+    )
+    assert [change.path for change in result.header] == [("ver",)]
+    print(
+        f"diff: {materials} materials, {changes} modified, removed and added: {duration:.2f}s"
+    )
+    return duration, len(result.unchanged)
+
+
+def scanning_surface_style(library, color, category):
+    """ProjectLibrary.get_surface_style as it used to be: styles are searched by
+    scanning every IfcSurfaceStyle of the file"""
+    file = library.file
+    name = f"color {color}" if color else f"category {category or 'Others'}"
+    for surface_style in file.by_type("IfcSurfaceStyle"):
+        if surface_style.Name == name:
+            return surface_style
+    return library.create_surface_style(name, color, category or "Others")
+
+
+def bench_surface_styles(
+    sizes: Tuple[int, ...] = (2500, 5000, 10000), scan_limit: int = 5000
+) -> List[Tuple[int, float, Optional[float]]]:
+    """Time surface style lookup of every material of synthetic producers of growing
+    size, with the style registry and by scanning the file (up to scan_limit)"""
+    from materialsdb.ifc.project_library import ProjectLibrary  # needs ifcopenshell
+
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            path = synthetic_producer(pathlib.Path(folder) / "producer.xml", size)
+            source = XmlDeserialiser().from_xml(str(path))
+        informations = [material.information for material in source.material]
+        library = ProjectLibrary()
+        registry_duration, styles = timeit(
+            lambda: [
+                library.get_surface_style(information.color, information.group)
+                for information in informations
+            ]
+        )
+        assert len(library.file.by_type("IfcSurfaceStyle")) == len(set(styles))
+        assert len(library.file.by_type("IfcSurfaceStyleShading")) == len(set(styles))
+        scan_duration = None
+        if size <= scan_limit:
+            library = ProjectLibrary()
+            scan_duration, scanned = timeit(
+                lambda: [
+                    scanning_surface_style(
+                        library, information.color, information.group
+                    )
+                    for information in informations
+                ]
+            )
+            assert [style.Name for style in scanned] == [style.Name for style in styles]
+        scan = f"{scan_duration:.2f}s" if scan_duration is not None else "skipped"
+        print(
+            f"surface styles: {size} materials, {len(set(styles))} styles: registry {registry_duration:.3f}s ({registry_duration / size * 1e6:.0f}us per material), scan {scan}"
+        )
+        results.append((size, registry_duration, scan_duration))
+    return results
+
+
+def walk_psets(layers: List[classes.Layer], country: str):
+    """Property extraction of ProjectLibrary.create_materials before extraction plans
+    used as a reference"""
+    from materialsdb.ifc.project_library import PSETS, get_value
+
+    results = []
+    for layer in layers:
+        psets = []
+        for pset_name, props in PSETS.items():
+            properties = []
+            for prop_name, definition in props.items():
+                primary_measure_type = definition["primary_measure_type"]
+                if not primary_measure_type:
+                    continue
+                value = get_value(layer, definition, country)
+                if value:
+                    unit_factor = definition.get("unit_factor", None) or 1
+                    properties.append(
+                        (prop_name, primary_measure_type, value * unit_factor)
+                    )
+            if properties:
+                psets.append((pset_name, properties))
+        results.append(psets)
+    return results
+
+
+def bench_psets(materials: int = 5000) -> Tuple[float, float]:
+    """Compare pset property extraction walking PSETS for each layer with a compiled
+    extraction plan in batch mode"""
+    from materialsdb.ifc.project_library import PLAN  # needs ifcopenshell
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = synthetic_producer(pathlib.Path(folder) / "producer.xml", materials)
+        source = XmlDeserialiser().from_xml(str(path))
+    layers = [
+        layer
+        for material in source.material
+        for layer in getattr(material.layers, "layer", ())
+    ]
+    walk_duration, expected = timeit(walk_psets, layers, "CH")
+    plan_duration, result = timeit(PLAN.extract_many, layers, "CH")
+    assert result == expected
+    print(
+        f"psets: {len(layers)} layers: walk {walk_duration:.3f}s, plan {plan_duration:.3f}s"
+    )
+    return walk_duration, plan_duration
+
+
+def build_library(source: classes.Materials, dedup: bool, folder: pathlib.Path):
+    """Build, write and load an ifc project library. Return durations, file size and
+    library."""
+    import ifcopenshell
+    from materialsdb.ifc.project_library import ProjectLibrary
+
+    path = folder / f"library_{dedup}.ifc"
+    library = ProjectLibrary(dedup=dedup)
+    start = time.perf_counter()
+    library.create_project_library(source)
+    library.create_materials(source)
+    build_duration = time.perf_counter() - start
+    write_duration, _ = timeit(library.file.write, str(path))
+    load_duration, _ = timeit(ifcopenshell.open, str(path))
+    return build_duration, write_duration, load_duration, path.stat().st_size, library
+
+
+def bench_entity_pool(materials: int = 2000) -> Tuple[float, int, int]:
+    """Compare ifc project libraries built with and without entity deduplication"""
+    with tempfile.TemporaryDirectory() as folder:
+        folder = pathlib.Path(folder)
+        path = synthetic_producer(folder / "producer.xml", materials)
+        source = XmlDeserialiser().from_xml(str(path))
+        results = {
+            dedup: build_library(source, dedup, folder) for dedup in (False, True)
+        }
+    plain, pooled = results[False][4], results[True][4]
+    assert len(pooled.file.by_type("IfcMaterialProperties")) == len(
+        plain.file.by_type("IfcMaterialProperties")
+    )
+    assert len(list(pooled.file)) < len(list(plain.file))
+    for dedup, (build, write, load, size, library) in results.items():
+        label = "pooled" if dedup else "plain"
+        print(
+            f"entity pool: {materials} materials, {label}: build {build:.2f}s, write {write:.2f}s, load {load:.2f}s, {size / 1e6:.1f}MB, {len(list(library.file))} entities"
+        )
+    print(pooled.pool.format_report())
+    return pooled.pool.ratio(), results[False][3], results[True][3]
+
+
+def bench_patch(materials: int = 2000, changes: int = 50) -> Tuple[float, float]:
+    """Patch an ifc library with changes modified, removed and added materials and
+    compare with a full build of the new version"""
+    import collections
+
+    import ifcopenshell
+    from materialsdb.ifc import project_library
+
+    with tempfile.TemporaryDirectory() as folder:
+        folder = pathlib.Path(folder)
+        path = synthetic_producer(folder / "producer.xml", materials)
+        added_path = synthetic_producer(folder / "added.xml", changes, 1)
+        deserialiser = XmlDeserialiser()
+        old = deserialiser.from_xml(str(path))
+        new = deserialiser.from_xml(str(path))
+        added = deserialiser.from_xml(str(added_path)).material
+        rng = random.Random(0)
+        picked = rng.sample(range(materials), 2 * changes)
+        for index in picked[:changes]:
+            for thermal in new.material[index].layers.layer[0].thermal:
+                thermal.lambda_value = (thermal.lambda_value or 0) + 0.01
+        removed = {new.material[index].id for index in picked[changes:]}
+        new.material = [
+            material for material in new.material if material.id not in removed
+        ] + added
+        library_path = folder / "library.ifc"
+        project_library.build_project_library(old).write(str(library_path))
+
+        def patch():
+            file = ifcopenshell.open(str(library_path))
+            project_library.patch_project_library(file, old, new)
+            return file
+
+        patch_duration, patched = timeit(patch)
+        build_duration, built = timeit(project_library.build_project_library, new)
+    assert collections.Counter(entity.is_a() for entity in patched) == (
+        collections.Counter(entity.is_a() for entity in built)
+    )
+    assert sorted(entity.GlobalId for entity in patched.by_type("IfcRoot")) == sorted(
+        entity.GlobalId for entity in built.by_type("IfcRoot")
+    )
+    print(
+        f"patch: {materials} materials, {changes} modified, removed and added: patch {patch_duration:.2f}s, full build {build_duration:.2f}s"
+    )
+    return patch_duration, build_duration
+
+
+def mean_by_group(materials: List[classes.Material], country: str) -> Dict[str, float]:
+    """Brute force equivalent of columnar aggregation used as a reference"""
+    values: Dict[str, List[float]] = {}
+    for material in materials:
+        for layer in getattr(material.layers, "layer", ()):
+            thermal = utils.get_by_country(layer.thermal, country)
+            if thermal is not None and thermal.lambda_value is not None:
+                group = material.information.group or ""
+                values.setdefault(group, []).append(thermal.lambda_value)
+    return {
+        group: sum(group_values) / len(group_values)
+        for group, group_values in values.items()
+    }
+
+
+def bench_columnar(
+    producers: int = 20, materials: int = 500
+) -> Tuple[float, float, float]:
+    """Compare a vectorized aggregation over memory mapped columns with deserialising
+    every producer and aggregating dataclasses"""
+    from materialsdb import columnar  # numpy is only required by this benchmark
+
+    with temporary_cache():
+        for number in range(producers):
+            synthetic_producer(
+                cache.get_producers_dir() / f"producer_{number}.xml", materials, number
+            )
+        export_duration, directory = timeit(columnar.export)
+
+        def aggregate():
+            columns = columnar.Columns.load(directory)
+            return columns.aggregate(
+                "group",
+                "lambda_value",
+                mask=columns.mask(country="CH", lambda_value=(None, None)),
+            )
+
+        query_duration, result = timeit(aggregate)
+        deserialiser = XmlDeserialiser()
+        scan_duration, expected = timeit(
+            lambda: mean_by_group(
+                [
+                    material
+                    for path in cache.producers()
+                    for material in deserialiser.from_xml(str(path)).material
+                ],
+                "CH",
+            )
+        )
+    assert result.keys() == expected.keys()
+    assert all(abs(result[group] - expected[group]) < 1e-9 for group in expected)
+    print(
+        f"columnar: {producers * materials} materials: export {export_duration:.2f}s, load and aggregate {query_duration * 1000:.1f}ms, deserialise and aggregate {scan_duration:.2f}s"
+    )
+    return export_duration, query_duration, scan_duration
+
+
+def reflective_from_element(element, element_class):
+    """Deserialiser resolving type hints for every element as XmlDeserialiser used to"""
+    kwargs = {}
+    if element_class.xs_type != "element":
+        kwargs["object"] = element.text or ""
+    type_hints = typing.get_type_hints(element_class)
+    for attrib in element_class.xml_attributes:
+        value = element.get(attrib)
+        if value is not None:
+            kwargs[attrib] = strip_optional(type_hints[attrib])(value)
+    for child_name in getattr(element_class, "xml_elements", ()):
+        base_class = strip_optional(type_hints[child_name])
+        if typing.get_origin(base_class) is list:
+            inner_type = typing.get_args(base_class)[0]
+            kwargs[child_name] = [
+                reflective_from_element(child, inner_type)
+                for child in getattr(element, child_name, ())
+            ]
+        else:
+            child = getattr(element, child_name, None)
+            if child is not None:
+                kwargs[child_name] = reflective_from_element(child, base_class)
+    return element_class(**kwargs)
+
+
+def bench_deserialise(materials: int = 5000) -> Tuple[float, float]:
+    """Compare compiled decode plans with type hints reflection per element"""
+    with tempfile.TemporaryDirectory() as folder:
+        xml_path = synthetic_producer(pathlib.Path(folder) / "producer.xml", materials)
+        root = get_valid_root(objectify.parse(str(xml_path)))
+        reflective_duration, expected = timeit(
+            reflective_from_element, root, classes.Materials
+        )
+        plan_duration, result = timeit(XmlDeserialiser().from_element, root)
+    assert result == expected
+    print(
+        f"deserialise: {materials} materials: reflection {reflective_duration:.2f}s, plans {plan_duration:.2f}s"
+    )
+    return reflective_duration, plan_duration
+
+
+def list_names(materials: classes.Materials) -> List[Tuple[str, str]]:
+    return [
+        (material.information.names.name[0], material.information.group)
+        for material in materials.material
+    ]
+
+
+def bench_lazy(materials: int = 5000) -> Tuple[float, float, float]:
+    """List material names and groups from an eagerly and a lazily decoded producer"""
+    with tempfile.TemporaryDirectory() as folder:
+        xml_path = str(
+            synthetic_producer(pathlib.Path(folder) / "producer.xml", materials)
+        )
+        deserialiser = XmlDeserialiser()
+        parse_duration, _ = timeit(objectify.parse, xml_path)
+        eager_duration, expected = timeit(
+            lambda: list_names(deserialiser.from_xml(xml_path))
+        )
+        lazy_duration, result = timeit(
+            lambda: list_names(deserialiser.from_xml(xml_path, lazy=True))
+        )
+    assert result == expected
+    print(
+        f"lazy: {materials} materials: parse only {parse_duration:.2f}s, eager {eager_duration:.2f}s, lazy {lazy_duration:.2f}s"
+    )
+    return parse_duration, eager_duration, lazy_duration
+
+
+def count_materials(materials: classes.Materials) -> int:
+    return len(materials.material)
+
+
+def bench_bulk(
+    producers: int = 16, materials: int = 1000, workers: Tuple[int, ...] = (1, 0)
+) -> List[Tuple[int, float]]:
+    """Deserialise producers serially and on a process pool (0: one per core)"""
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        paths = [
+            synthetic_producer(
+                pathlib.Path(folder) / f"producer_{number}.xml", materials, number
+            )
+            for number in range(producers)
+        ]
+        for worker_count in workers:
+            duration, loaded = timeit(
+                bulk.map_producers,
+                count_materials,
+                paths,
+                worker_count or None,
+                use_snapshots=False,
+            )
+            assert [result.result for result in loaded] == [materials] * producers
+            print(
+                f"bulk: {producers} producers, {worker_count or os.cpu_count()} workers: {duration:.2f}s"
+            )
+            results.append((worker_count, duration))
+    return results
+
+
+def bench_memory(materials: int = 2000) -> float:
+    """Report python memory held by a deserialised producer per material"""
+    with tempfile.TemporaryDirectory() as folder:
+        xml_path = synthetic_producer(pathlib.Path(folder) / "producer.xml", materials)
+        deserialiser = XmlDeserialiser()
+        tracemalloc.start()
+        loaded = list(deserialiser.iter_materials(str(xml_path)))
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    bytes_per_material = size / len(loaded)
+    print(f"memory: {materials} materials: {bytes_per_material:.0f} bytes per material")
+    return bytes_per_material
+
+
+def main():
+    bench_downloads()
+    bench_revalidation()
+    bench_index_diff()
+    bench_snapshot()
+    bench_offsets()
+    bench_catalogue()
+    bench_search()
+    bench_availability()
+    bench_columnar()
+    bench_diff()
+    bench_surface_styles()
+    bench_psets()
+    bench_entity_pool()
+    bench_patch()
+    bench_deserialise()
+    bench_lazy()
+    bench_bulk()
+    bench_memory()
+
+
+if __name__ == "__main__":
+    main()
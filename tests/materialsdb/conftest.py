@@ -0,0 +1,8 @@
+"""Tests run against lib/materialsdb without installing it. Run with:
+python -m pytest tests/materialsdb
+"""
+import pathlib
+import sys
+
+# Appended so installed packages take precedence over the Windows builds of lib
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[2] / "lib"))
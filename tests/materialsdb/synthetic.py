@@ -0,0 +1,188 @@
+# coding: UTF-8
+"""Synthetic materialsdb data and a local stand-in for materialsdb.org shared by tests
+and benchmarks.
+
+Synthetic producers follow materialsdb103.xsd closely enough to be deserialised but
+their content is meaningless.
+"""
+import contextlib
+import functools
+import http.server
+import os
+import pathlib
+import random
+import tempfile
+import threading
+import time
+import uuid
+from typing import Iterator
+
+from lxml import etree
+
+from materialsdb import classes
+
+NAMESPACE = "http://www.materialsdb.org"
+INDEX_NAMESPACE = "http://www.materialsDB.org"
+LANGS = ("fr", "de", "it", "en")
+COUNTRIES = ("CH", "FR", "DE", "AT")
+# Groupkind.xml_enum spells "air" while schema expects "Air"
+GROUPS = tuple(group for group in classes.Groupkind.xml_enum if group != "air")
+
+
+def synthetic_id(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128)))
+
+
+def synthetic_material(rng: random.Random, layers: int = 2) -> etree._Element:
+    material = etree.Element(
+        f"{{{NAMESPACE}}}material", id=synthetic_id(rng), type="simple"
+    )
+    information = etree.SubElement(
+        material,
+        f"{{{NAMESPACE}}}information",
+        group=rng.choice(GROUPS),
+        wall=rng.choice("01"),
+        roof=rng.choice("01"),
+    )
+    names = etree.SubElement(information, f"{{{NAMESPACE}}}names")
+    explanations = etree.Element(f"{{{NAMESPACE}}}explanations")
+    number = rng.randrange(10 ** 6)
+    for lang in LANGS:
+        name = etree.SubElement(names, f"{{{NAMESPACE}}}name", lang=lang)
+        name.text = f"Material {number} {lang}"
+        explanation = etree.SubElement(
+            explanations, f"{{{NAMESPACE}}}explanation", lang=lang
+        )
+        explanation.text = f"Description of material {number} in {lang}"
+    countries = etree.SubElement(information, f"{{{NAMESPACE}}}countries")
+    for country in COUNTRIES:
+        etree.SubElement(
+            countries,
+            f"{{{NAMESPACE}}}country",
+            name=country,
+            sellingfrom=str(rng.uniform(36000, 44000)),
+        )
+    information.append(explanations)
+    if number % 2:  # Other materials get their style from their group
+        information.set("color", str(number))
+    layers_element = etree.SubElement(material, f"{{{NAMESPACE}}}layers")
+    for _ in range(layers):
+        layer = etree.SubElement(
+            layers_element, f"{{{NAMESPACE}}}layer", id=synthetic_id(rng)
+        )
+        for country in COUNTRIES[:2]:
+            etree.SubElement(
+                layer,
+                f"{{{NAMESPACE}}}geometry",
+                country=country,
+                thick=str(rng.choice((10, 20, 50, 100, 200))),
+            )
+        for country in COUNTRIES[:2]:
+            etree.SubElement(
+                layer,
+                f"{{{NAMESPACE}}}thermal",
+                country=country,
+                lambda_value=str(round(rng.uniform(0.02, 2.5), 3)),
+                therm_capa=str(round(rng.uniform(0.2, 0.6), 2)),
+            )
+        for country in COUNTRIES[:2]:
+            etree.SubElement(
+                layer,
+                f"{{{NAMESPACE}}}physical",
+                country=country,
+                density=str(rng.choice((20, 500, 1200, 2400, 7800))),
+                Porosity=str(round(rng.uniform(0, 1), 2)),
+            )
+    return material
+
+
+def synthetic_producer(
+    path: pathlib.Path, materials: int = 100, seed: int = 0, ver: int = 1
+) -> pathlib.Path:
+    rng = random.Random(seed)
+    root = etree.Element(
+        f"{{{NAMESPACE}}}materials",
+        nsmap={None: NAMESPACE},
+        company=f"Company {seed}",
+        companyid=synthetic_id(rng),
+        ver=str(ver),
+        crd="44000",
+        verXML="103",
+    )
+    for _ in range(materials):
+        root.append(synthetic_material(rng))
+    for name in ("sig", "publickey"):
+        element = etree.SubElement(root, f"{{{NAMESPACE}}}{name}", ver="1")
+        element.text = "00"
+    etree.ElementTree(root).write(
+        str(path), encoding="UTF-8", xml_declaration=True, pretty_print=True
+    )
+    return path
+
+
+def synthetic_index(
+    companies: int, base_url: str = "http://localhost", seed: int = 0
+) -> etree._Element:
+    rng = random.Random(seed)
+    root = etree.Element(
+        f"{{{INDEX_NAMESPACE}}}MaterialsDBIndex",
+        nsmap={None: INDEX_NAMESPACE},
+        verXML="100",
+    )
+    for number in range(companies):
+        etree.SubElement(
+            root,
+            f"{{{INDEX_NAMESPACE}}}company",
+            id=synthetic_id(rng),
+            name=f"Company {number}",
+            href=f"{base_url}/producer_{number}.xml",
+            LastKnownDate=str(40000 + number),
+            KnownVersion="1",
+            KnownCRD=str(40000 + number),
+        )
+    return root
+
+
+class SlowHandler(http.server.SimpleHTTPRequestHandler):
+    """Serve files with a fixed latency to stand in for materialsdb.org"""
+
+    latency = 0.05
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def serve(directory: pathlib.Path, latency: float = 0.05) -> Iterator[str]:
+    handler = type("Handler", (SlowHandler,), {"latency": latency})
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), functools.partial(handler, directory=str(directory))
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextlib.contextmanager
+def temporary_cache() -> Iterator[pathlib.Path]:
+    """Redirect materialsdb cache to a temporary folder"""
+    previous = {key: os.environ.get(key) for key in ("APPDATA", "XDG_CACHE_HOME")}
+    with tempfile.TemporaryDirectory() as folder:
+        os.environ.pop("APPDATA", None)
+        os.environ["XDG_CACHE_HOME"] = folder
+        try:
+            yield pathlib.Path(folder) / "materialsdb"
+        finally:
+            for key, value in previous.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
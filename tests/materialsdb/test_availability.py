@@ -0,0 +1,38 @@
+import random
+
+from materialsdb import utils
+from materialsdb.serialiser import XmlDeserialiser
+from synthetic import COUNTRIES, synthetic_producer
+
+
+def load_sources(folder, producers=3, materials=100):
+    deserialiser = XmlDeserialiser()
+    return [
+        deserialiser.from_xml(
+            str(
+                synthetic_producer(folder / f"producer_{number}.xml", materials, number)
+            )
+        )
+        for number in range(producers)
+    ]
+
+
+def test_index_matches_is_available(tmp_path):
+    sources = load_sources(tmp_path)
+    materials = [material for source in sources for material in source.material]
+    # One material is not restricted to any country
+    materials[0].information.countries = None
+    index = utils.AvailabilityIndex(materials)
+    rng = random.Random(0)
+    for country in COUNTRIES + ("IT",):
+        for _ in range(10):
+            date = rng.uniform(36000, 46000)
+            expected = [m for m in materials if utils.is_available(m, country, date)]
+            assert index.available(country, date) == expected
+
+
+def test_get_materials_matches_index(tmp_path):
+    (source,) = load_sources(tmp_path, producers=1)
+    index = utils.AvailabilityIndex.from_sources([source])
+    for country in COUNTRIES + ("IT",):
+        assert list(utils.get_materials(source, country)) == index.available(country)
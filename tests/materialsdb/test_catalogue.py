@@ -0,0 +1,110 @@
+import random
+
+from lxml import etree
+
+from materialsdb import cache, catalogue, utils
+from materialsdb.serialiser import XmlDeserialiser
+from synthetic import NAMESPACE, synthetic_material, synthetic_producer, temporary_cache
+
+
+def is_insulation_for(material, country, minimum, maximum):
+    """Brute force equivalent of a catalogue query"""
+    information = material.information
+    if information.group != "Insulation":
+        return False
+    countries = [c.name for c in getattr(information.countries, "country", ())]
+    if countries and country not in countries:
+        return False
+    for layer in getattr(material.layers, "layer", ()):
+        value = utils.get_by_country(layer.thermal or (), country)
+        if value and value.lambda_value is not None:
+            if minimum <= value.lambda_value <= maximum:
+                return True
+    return False
+
+
+def test_query_matches_brute_force():
+    with temporary_cache():
+        paths = [
+            synthetic_producer(
+                cache.get_producers_dir() / f"producer_{number}.xml", 200, number
+            )
+            for number in range(3)
+        ]
+        with catalogue.Catalogue() as database:
+            assert sorted(database.sync()) == paths
+            result = database.query(
+                group="Insulation", country="CH", lambda_value=(0.02, 0.5)
+            )
+        deserialiser = XmlDeserialiser()
+        expected = [
+            material.id
+            for path in paths
+            for material in deserialiser.from_xml(str(path)).material
+            if is_insulation_for(material, "CH", 0.02, 0.5)
+        ]
+    assert expected
+    assert [row.id for row in result] == expected
+
+
+def insulation(seed, thermal_values):
+    """Synthetic insulation with a single layer holding thermal_values, a list of
+    (country, lambda_value) where country None is a value without country"""
+    material = synthetic_material(random.Random(seed), layers=1)
+    material.find(f"{{{NAMESPACE}}}information").set("group", "Insulation")
+    layer = material.find(f"{{{NAMESPACE}}}layers/{{{NAMESPACE}}}layer")
+    for thermal in layer.findall(f"{{{NAMESPACE}}}thermal"):
+        layer.remove(thermal)
+    for country, value in thermal_values:
+        thermal = etree.SubElement(
+            layer, f"{{{NAMESPACE}}}thermal", lambda_value=str(value)
+        )
+        if country:
+            thermal.set("country", country)
+    return material
+
+
+def write_producer(materials):
+    path = synthetic_producer(cache.get_producers_dir() / "producer.xml", 0)
+    tree = etree.parse(str(path))
+    for position, material in enumerate(materials):
+        tree.getroot().insert(position, material)
+    tree.write(str(path))
+    return path
+
+
+def test_unqualified_value_only_used_without_country_value():
+    cases = [
+        [("CH", 0.5), (None, 0.03)],
+        [(None, 0.03)],
+        [("CH", 0.03), (None, 0.5)],
+        [("FR", 0.03)],
+    ]
+    materials = [insulation(seed, values) for seed, values in enumerate(cases)]
+    ids = [material.get("id") for material in materials]
+    with temporary_cache():
+        write_producer(materials)
+        with catalogue.Catalogue() as database:
+            database.sync()
+            for_ch = database.query(country="CH", lambda_value=(0.02, 0.04))
+            for_any = database.query(lambda_value=(0.02, 0.04))
+    assert [row.id for row in for_ch] == [ids[1], ids[2]]
+    assert [row.id for row in for_any] == ids
+
+
+def test_names_are_kept_per_language_and_country():
+    material = insulation(0, [(None, 0.03)])
+    names = material.find(f"{{{NAMESPACE}}}information/{{{NAMESPACE}}}names")
+    for country in ("CH", "FR"):
+        name = etree.SubElement(
+            names, f"{{{NAMESPACE}}}name", lang="fr", country=country
+        )
+        name.text = f"Isolant {country}"
+    with temporary_cache():
+        write_producer([material])
+        with catalogue.Catalogue() as database:
+            database.sync()
+            (result,) = database.query()
+    assert result.names[("fr", "CH")] == "Isolant CH"
+    assert result.names[("fr", "FR")] == "Isolant FR"
+    assert ("fr", "") in result.names
@@ -0,0 +1,42 @@
+import random
+
+from materialsdb import diff
+from materialsdb.serialiser import XmlDeserialiser
+from synthetic import synthetic_producer
+
+
+def test_diff_reports_modified_removed_and_added(tmp_path):
+    materials, changes = 200, 10
+    path = synthetic_producer(tmp_path / "old.xml", materials)
+    added_path = synthetic_producer(tmp_path / "added.xml", changes, 1)
+    deserialiser = XmlDeserialiser()
+    old = deserialiser.from_xml(str(path))
+    new = deserialiser.from_xml(str(path))
+    added = deserialiser.from_xml(str(added_path)).material
+    picked = random.Random(0).sample(range(materials), 2 * changes)
+    modified = {new.material[index].id for index in picked[:changes]}
+    removed = {new.material[index].id for index in picked[changes:]}
+    for material in new.material:
+        if material.id in modified:
+            thermal = material.layers.layer[0].thermal[0]
+            thermal.lambda_value = (thermal.lambda_value or 0) + 0.01
+    new.material = [
+        material for material in new.material if material.id not in removed
+    ] + added
+    new.ver += 1
+
+    result = diff.diff_materials(old, new)
+
+    assert {material_diff.new.id for material_diff in result.modified} == modified
+    assert {material.id for material in result.removed} == removed
+    assert [material.id for material in result.added] == [m.id for m in added]
+    assert len(result.unchanged) == materials - 2 * changes
+    for material_diff in result.modified:
+        assert len(material_diff.changes) == 1
+        assert material_diff.changes[0].path[-1] == "lambda_value"
+    assert [change.path for change in result.header] == [("ver",)]
+
+
+def test_same_file_has_no_changes(tmp_path):
+    path = synthetic_producer(tmp_path / "producer.xml", 50)
+    assert diff.is_empty(diff.diff_files(path, path))
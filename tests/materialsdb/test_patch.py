@@ -0,0 +1,60 @@
+import collections
+import random
+
+import pytest
+
+from materialsdb.serialiser import XmlDeserialiser
+from synthetic import synthetic_producer
+
+ifcopenshell = pytest.importorskip("ifcopenshell")
+project_library = pytest.importorskip("materialsdb.ifc.project_library")
+
+
+def entity_counts(file):
+    return collections.Counter(entity.is_a() for entity in file)
+
+
+def global_ids(file):
+    return sorted(entity.GlobalId for entity in file.by_type("IfcRoot"))
+
+
+def test_patch_matches_full_build(tmp_path):
+    materials, changes = 100, 5
+    path = synthetic_producer(tmp_path / "producer.xml", materials)
+    added_path = synthetic_producer(tmp_path / "added.xml", changes, 1)
+    deserialiser = XmlDeserialiser()
+    old = deserialiser.from_xml(str(path))
+    new = deserialiser.from_xml(str(path))
+    added = deserialiser.from_xml(str(added_path)).material
+    picked = random.Random(0).sample(range(materials), 2 * changes)
+    for index in picked[:changes]:
+        for thermal in new.material[index].layers.layer[0].thermal:
+            thermal.lambda_value = (thermal.lambda_value or 0) + 0.01
+    removed = {new.material[index].id for index in picked[changes:]}
+    new.material = [
+        material for material in new.material if material.id not in removed
+    ] + added
+    library_path = tmp_path / "library.ifc"
+    project_library.build_project_library(old).write(str(library_path))
+
+    patched = ifcopenshell.open(str(library_path))
+    project_library.patch_project_library(patched, old, new)
+    built = project_library.build_project_library(new)
+
+    assert entity_counts(patched) == entity_counts(built)
+    assert global_ids(patched) == global_ids(built)
+
+
+def test_global_ids_are_unique_and_stable(tmp_path):
+    path = synthetic_producer(tmp_path / "producer.xml", 50)
+    source = XmlDeserialiser().from_xml(str(path))
+    for material in source.material:
+        information = material.information
+        information.wall = information.roof = information.floor = 1
+    for dedup in (False, True):
+        library = project_library.ProjectLibrary(dedup=dedup)
+        library.create_project_library(source)
+        library.create_materials(source)
+        ids = global_ids(library.file)
+        assert len(ids) == len(set(ids))
+        assert ids == global_ids(project_library.build_project_library(source))